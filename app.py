@@ -1,36 +1,39 @@
-import json
-import re
 
 import streamlit as st
 from PIL import Image
 from safety_checker import check_safety
-from fixer import fix_text
+from fixer import fix_text_stream
 from logger import log_event
 from text_analyzer import analyze_text_for_distress
-from image_analyzer import analyze_image_combined
+from combined_analyzer import analyze_text_combined
+from orchestrator import run_text_analysis
+from image_analyzer import analyze_image_combined, warmup_models, unload_models, model_stats
 from recommendations import get_support_recommendations
 from notifier import notify_contact
-import time
 from google.genai.errors import ServerError, ClientError
+from rate_limiter import CircuitOpenError
+import time
 
 st.set_page_config(page_title="AI Prompt Safety Evaluator")
 st.title("AI Prompt Safety Evaluator")
 st.write("Evaluate text and images for safety and emotional distress.")
 
-# ------------------- Retry wrapper -------------------
-def retry_api_call(func, *args, retries=3, delay=5, **kwargs):
-    for i in range(retries):
-        try:
-            return func(*args, **kwargs)
-        except ServerError:
-            if i < retries - 1:
-                time.sleep(delay)
-            else:
-                return {"error": "The AI model is currently overloaded. Please try again later."}
-        except ClientError as e:
-            return {"error": f"Client error occurred: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error occurred: {str(e)}"}
+# ------------------- API error wrapper -------------------
+# Rate limits, retries with backoff and the circuit breaker live in rate_limiter, shared by
+# every Gemini call; this only turns the errors that still come through into UI messages.
+def call_api(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except CircuitOpenError:
+        return {"error": "The AI model is temporarily unavailable after repeated failures. Please try again shortly."}
+    except ServerError:
+        return {"error": "The AI model is currently overloaded. Please try again later."}
+    except ClientError as e:
+        if e.code == 429:
+            return {"error": "The AI model's rate limit was reached. Please try again in a minute."}
+        return {"error": f"Client error occurred: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Unexpected error occurred: {str(e)}"}
 
 # ------------------- Helper functions -------------------
 def risk_color(level: str):
@@ -48,6 +51,70 @@ def risk_progress(level: str):
     mapping = {"none":0, "low":0.33, "medium":0.66, "high":1.0}
     return mapping.get(level.lower(), 0)
 
+def render_safety_card(result):
+    if "error" in result:
+        st.error(result["error"])
+        return
+    color = "red" if result.get("is_harmful", "").lower() == "yes" else "green"
+    st.markdown(f"<div style='padding:10px; border:2px solid {color}; border-radius:8px;'>"
+                f"<h4>Safety Result</h4>"
+                f"<p><b>Harmful:</b> {result.get('is_harmful')}</p>"
+                f"<p><b>Category:</b> {result.get('category', 'N/A')}</p>"
+                f"<p><b>Explanation:</b> {result.get('explanation')}</p>"
+                f"</div>", unsafe_allow_html=True)
+
+def render_safe_version(safe_output):
+    if isinstance(safe_output, dict) and "error" in safe_output:
+        st.error(safe_output["error"])
+        return
+    st.markdown(f"<div style='padding:10px; border:2px solid green; border-radius:8px;'>"
+                f"<h4>Safe Version Suggestions</h4>"
+                f"<p>{safe_output}</p>"
+                f"</div>", unsafe_allow_html=True)
+
+def distress_fields(result):
+    """ sentiment, risk_level, explanation, recommended actions of a distress result """
+    result = result or {}
+    if "error" in result or not result:
+        return "Unknown – API unavailable", "Unknown – API unavailable", result.get("error", "No data returned from API."), []
+    # Already parsed and normalized by response_parser
+    if result.get("parse_error"):
+        return "Unknown – parse error", "Unknown – parse error", result.get("explanation"), []
+    return (result.get("sentiment", "Unknown"), result.get("risk_level", "Unknown"),
+            result.get("explanation", "No explanation provided."), result.get("recommended_actions", []))
+
+def render_distress_card(result):
+    sentiment, risk_level, explanation, actions = distress_fields(result)
+    st.write("DEBUG: Distress API result:", result)
+
+    color = risk_color(risk_level)
+    st.markdown(f"<div style='padding:10px; border:2px solid {color}; border-radius:8px;'>"
+                f"<h4>Distress Detection Result</h4>"
+                f"<p><b>Sentiment:</b> {sentiment}</p>"
+                f"<p><b>Risk Level:</b> {risk_level}</p>"
+                f"<p><b>Explanation:</b> {explanation}</p>", unsafe_allow_html=True)
+
+    st.progress(risk_progress(risk_level))
+
+    if actions:
+        st.markdown("<b>Recommended Actions:</b>", unsafe_allow_html=True)
+        for i, action in enumerate(actions, 1):
+            st.markdown(f"<b>{i}.</b> {action}", unsafe_allow_html=True)
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def combined_analysis_events(text):
+    """ Single-request mode, as the same events orchestrator.run_text_analysis yields """
+    started = time.perf_counter()
+    combined = call_api(analyze_text_combined, text)
+    seconds = time.perf_counter() - started
+    if "error" in combined:
+        combined = {"safety": combined, "safe_output": None, "distress": combined}
+    yield {"stage": "safety", "result": combined["safety"], "started": 0.0, "seconds": seconds}
+    if combined["safe_output"] is not None:
+        yield {"stage": "rewrite", "result": combined["safe_output"], "started": 0.0, "seconds": seconds}
+    yield {"stage": "distress", "result": combined["distress"], "started": 0.0, "seconds": seconds}
+
 # ------------------- Initialize session_state -------------------
 if "combined_text" not in st.session_state:
     st.session_state.combined_text = ""
@@ -63,6 +130,24 @@ if "uploaded_image" not in st.session_state:
     st.session_state.uploaded_image = None
 if "image_result" not in st.session_state:
     st.session_state.image_result = {}
+if "stage_timings" not in st.session_state:
+    st.session_state.stage_timings = {}
+
+# ------------------- Sidebar: image models -------------------
+# Image models load on the first uploaded image; they can also be loaded ahead of time here.
+with st.sidebar.expander("Image models"):
+    col_warm, col_unload = st.columns(2)
+    if col_warm.button("Warm up", key="warmup_models_btn"):
+        with st.spinner("Loading image models..."):
+            warmup_models()
+    if col_unload.button("Unload", key="unload_models_btn"):
+        unload_models()
+    loaded_models = {name: stats for name, stats in model_stats().items() if stats["loaded"]}
+    if not loaded_models:
+        st.write("No image models loaded yet.")
+    for name, stats in loaded_models.items():
+        st.write(f"**{name}**: loaded in {stats['load_seconds']:.1f}s, "
+                 f"{stats['tensor_bytes'] / 1e6:.0f} MB weights")
 
 # ------------------- Tabs -------------------
 tab1, tab2, tab3 = st.tabs([
@@ -79,99 +164,63 @@ with tab1:
         value=st.session_state.combined_text,
         key="combined_text_area"
     )
+    single_request = st.checkbox(
+        "Single request (safety, distress and rewrite in one API call)",
+        key="single_request_mode"
+    )
 
+    distress_rendered = False
     if st.button("Analyze Text", key="analyze_combined_btn"):
         if not st.session_state.combined_text.strip():
             st.warning("Please enter some text.")
         else:
+            text = st.session_state.combined_text
+            st.session_state.safe_output = ""
+            # One slot per result, filled in whichever order the analyses finish
+            safety_slot, rewrite_slot, distress_slot = st.empty(), st.empty(), st.empty()
+            analysis_start = time.perf_counter()
             with st.spinner("Analyzing..."):
-                # Safety check
-                st.session_state.safety_result = retry_api_call(check_safety, st.session_state.combined_text)
-                if "error" in st.session_state.safety_result:
-                    st.error(st.session_state.safety_result["error"])
+                if single_request:
+                    events = combined_analysis_events(text)
                 else:
-                    # Safety card
-                    color = "red" if st.session_state.safety_result.get("is_harmful", "").lower() == "yes" else "green"
-                    st.markdown(f"<div style='padding:10px; border:2px solid {color}; border-radius:8px;'>"
-                                f"<h4>Safety Result</h4>"
-                                f"<p><b>Harmful:</b> {st.session_state.safety_result.get('is_harmful')}</p>"
-                                f"<p><b>Category:</b> {st.session_state.safety_result.get('category', 'N/A')}</p>"
-                                f"<p><b>Explanation:</b> {st.session_state.safety_result.get('explanation')}</p>"
-                                f"</div>", unsafe_allow_html=True)
-                    log_event(st.session_state.combined_text, st.session_state.safety_result)
-
-                    # Safe Version Suggestions
-                    if st.session_state.safety_result.get("is_harmful", "").lower() == "yes":
-                        st.session_state.safe_output = retry_api_call(fix_text, st.session_state.combined_text)
-                        if isinstance(st.session_state.safe_output, dict) and "error" in st.session_state.safe_output:
-                            st.error(st.session_state.safe_output["error"])
-                        else:
-                            st.markdown(f"<div style='padding:10px; border:2px solid green; border-radius:8px;'>"
-                                        f"<h4>Safe Version Suggestions</h4>"
-                                        f"<p>{st.session_state.safe_output}</p>"
-                                        f"</div>", unsafe_allow_html=True)
-
-                # Distress detection
-                st.session_state.distress_result = retry_api_call(analyze_text_for_distress, st.session_state.combined_text)
+                    events = run_text_analysis(
+                        text,
+                        safety_fn=lambda t: call_api(check_safety, t),
+                        distress_fn=lambda t: call_api(analyze_text_for_distress, t),
+                        # Streamed, so the rewrite is shown while it is being generated
+                        fix_fn=fix_text_stream
+                    )
+                timings = {}
+                for event in events:
+                    stage, result = event["stage"], event["result"]
+                    if event.get("partial"):
+                        with rewrite_slot.container():
+                            render_safe_version(result)
+                        continue
+                    timings[stage] = {"started": event["started"], "seconds": event["seconds"],
+                                      "first_chunk_seconds": event.get("first_chunk_seconds")}
+                    if stage == "safety":
+                        st.session_state.safety_result = result
+                        with safety_slot.container():
+                            render_safety_card(result)
+                        if "error" not in result:
+                            log_event(text, result)
+                    elif stage == "rewrite":
+                        st.session_state.safe_output = result
+                        with rewrite_slot.container():
+                            render_safe_version(result)
+                    else:
+                        st.session_state.distress_result = result
+                        with distress_slot.container():
+                            render_distress_card(result)
+                        distress_rendered = True
+            st.session_state.stage_timings = {"stages": timings, "total": time.perf_counter() - analysis_start}
 
     # Show results if exist
     if st.session_state.distress_result:
-        # result = st.session_state.distress_result
-        # # Default only if result is empty or contains an error
-        # if "error" in result or not result:
-        #     sentiment = "Unknown – API unavailable"
-        #     risk_level = "Unknown – API unavailable"
-        #     explanation = result.get("error", "No data returned from API.")
-        #     actions = []
-        # else:
-        #     # Use the actual values from the API, fallback only if None
-        #     sentiment = result.get("sentiment") or "Unknown"
-        #     risk_level = result.get("risk_level") or "Unknown"
-        #     explanation = result.get("explanation") or "No explanation provided."
-        #     actions = result.get("recommended_actions") or []
-        result = st.session_state.distress_result or {}
-
-        if "error" in result or not result:
-            sentiment = "Unknown – API unavailable"
-            risk_level = "Unknown – API unavailable"
-            explanation = result.get("error", "No data returned from API.")
-            actions = []
-        else:
-            # parse the raw_response JSON
-
-            raw = result.get("raw_response", "")
-            # remove ```json ... ``` to get a valid JSON
-            clean_json_str = re.sub(r"```json\s*|```", "", raw, flags=re.IGNORECASE).strip()
-
-            try:
-                data = json.loads(clean_json_str)
-                sentiment = data.get("sentiment", "Unknown")
-                risk_level = data.get("risk_level", "Unknown")
-                explanation = data.get("explanation", "No explanation provided.")
-                actions = data.get("recommended_actions", [])
-            except Exception as e:
-                sentiment = "Unknown – parse error"
-                risk_level = "Unknown – parse error"
-                explanation = f"Failed to parse API response: {str(e)}"
-                actions = []
-
-        st.write("DEBUG: Distress API result:", result)
-
-        color = risk_color(risk_level)
-        st.markdown(f"<div style='padding:10px; border:2px solid {color}; border-radius:8px;'>"
-                    f"<h4>Distress Detection Result</h4>"
-                    f"<p><b>Sentiment:</b> {sentiment}</p>"
-                    f"<p><b>Risk Level:</b> {risk_level}</p>"
-                    f"<p><b>Explanation:</b> {explanation}</p>", unsafe_allow_html=True)
-
-        st.progress(risk_progress(risk_level))
-
-        if actions:
-            st.markdown("<b>Recommended Actions:</b>", unsafe_allow_html=True)
-            for i, action in enumerate(actions, 1):
-                st.markdown(f"<b>{i}.</b> {action}", unsafe_allow_html=True)
-
-        st.markdown("</div>", unsafe_allow_html=True)
+        sentiment, risk_level, explanation, actions = distress_fields(st.session_state.distress_result)
+        if not distress_rendered:
+            render_distress_card(st.session_state.distress_result)
 
         # Quick Actions
         # st.markdown("### Quick Actions")
@@ -243,13 +292,23 @@ with tab1:
                     else:
                         st.error("Failed to send notification.")
 
+    # Debug: when each analysis started and how long it took
+    if st.session_state.stage_timings:
+        with st.expander("Debug: stage timings"):
+            for stage, timing in st.session_state.stage_timings["stages"].items():
+                first_chunk = timing.get("first_chunk_seconds")
+                streamed = f", first chunk after {first_chunk * 1000:.0f} ms" if first_chunk is not None else ""
+                st.write(f"**{stage}**: started at +{timing['started'] * 1000:.0f} ms, "
+                         f"took {timing['seconds'] * 1000:.0f} ms{streamed}")
+            st.write(f"**total**: {st.session_state.stage_timings['total'] * 1000:.0f} ms")
+
 # ------------------- TAB 2: Image -------------------
 with tab2:
     st.header("Image Emotional Risk Analyzer")
     uploaded = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg"], key="image_uploader")
     if uploaded:
         st.session_state.uploaded_image = uploaded
-        st.session_state.image_result = retry_api_call(analyze_image_combined, Image.open(uploaded).convert("RGB"))
+        st.session_state.image_result = call_api(analyze_image_combined, Image.open(uploaded).convert("RGB"))
 
     if st.session_state.image_result:
         result = st.session_state.image_result
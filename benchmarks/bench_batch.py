@@ -0,0 +1,46 @@
+# benchmarks/bench_batch.py
+# Throughput of check_safety (serial) vs check_safety_batch against the offline fake client.
+# Usage: python benchmarks/bench_batch.py [num_texts] [latency_seconds]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import near_duplicate
+import prefilter
+import rate_limiter
+from fake_client import FakeClient
+from safety_checker import check_safety, check_safety_batch
+
+
+def main():
+    # Measure the API path, not the pre-filter or cache hits
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    rate_limiter.set_scheduler(None)
+    num_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    texts = [f"sample message number {i}" for i in range(num_texts)]
+    fake = FakeClient(latency=latency)
+
+    # Serial baseline on a small slice, the full run would take num_texts * latency
+    serial_n = min(num_texts, 20)
+    start = time.perf_counter()
+    for text in texts[:serial_n]:
+        check_safety(text, api_client=fake)
+    elapsed = time.perf_counter() - start
+    print(f"serial             {serial_n / elapsed:10.1f} texts/sec")
+
+    for concurrency in (1, 8, 32, 128):
+        start = time.perf_counter()
+        results = check_safety_batch(texts, max_concurrency=concurrency, api_client=fake)
+        elapsed = time.perf_counter() - start
+        assert len(results) == num_texts
+        print(f"batch x{concurrency:<4}        {num_texts / elapsed:10.1f} texts/sec")
+
+
+if __name__ == "__main__":
+    main()
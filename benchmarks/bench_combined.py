@@ -0,0 +1,74 @@
+# benchmarks/bench_combined.py
+# Latency and token cost of the app's three sequential calls (check_safety, fix_text for harmful
+# text, analyze_text_for_distress) vs combined_analyzer.analyze_text_combined, against the fake client.
+# Usage: python benchmarks/bench_combined.py [num_texts] [latency_seconds]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import gemini_client
+import near_duplicate
+import prefilter
+import rate_limiter
+from combined_analyzer import analyze_text_combined
+from fake_client import FakeClient
+from fixer import fix_text
+from safety_checker import check_safety
+from text_analyzer import analyze_text_for_distress
+
+SAFETY = {"is_harmful": "yes", "category": "violence", "explanation": "Threatening language"}
+DISTRESS = {"sentiment": "negative", "risk_level": "medium", "explanation": "Anger towards a neighbour",
+            "recommended_actions": ["Take a break before responding", "Talk to someone you trust"]}
+REWRITE = "My neighbour keeps shouting and I am very frustrated with the situation."
+
+
+def make_responder(tokens):
+    def responder(prompt):
+        if '"rewrite"' in prompt:
+            text = json.dumps({"safety": SAFETY, "rewrite": REWRITE, "distress": DISTRESS})
+        elif "psychological safety evaluator" in prompt:
+            text = json.dumps(DISTRESS)
+        elif "safety analysis tool" in prompt:
+            text = json.dumps(SAFETY)
+        else:
+            text = REWRITE
+        # Same ~4 characters per token approximation as fake_client.FakeUsage
+        tokens["prompt"] += len(prompt) // 4
+        tokens["output"] += len(text) // 4
+        return text
+    return responder
+
+
+def main():
+    # Measure the API path, not the pre-filter or cache hits
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    rate_limiter.set_scheduler(None)
+    num_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    texts = [f"my neighbour keeps shouting, I am ready to fight him (message {i})" for i in range(num_texts)]
+
+    for name in ("sequential", "combined"):
+        tokens = {"prompt": 0, "output": 0}
+        fake = FakeClient(latency=latency, responder=make_responder(tokens))
+        gemini_client.set_client(fake)
+        start = time.perf_counter()
+        for text in texts:
+            if name == "combined":
+                analyze_text_combined(text)
+            else:
+                if check_safety(text)["is_harmful"] == "yes":
+                    fix_text(text)
+                analyze_text_for_distress(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<11} {elapsed / num_texts * 1000:8.0f} ms/text  {fake.calls / num_texts:4.1f} calls/text  "
+              f"{tokens['prompt'] / num_texts:6.0f} prompt + {tokens['output'] / num_texts:5.0f} output tokens/text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_image_batch.py
+# Images/sec of analyze_images_batch at several batch sizes on CPU.
+# Uses the images in a folder if given, otherwise synthetic noise images.
+# Usage: python benchmarks/bench_image_batch.py [image_dir] [num_images]
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_analyzer import analyze_image_combined, analyze_images_batch, warmup_models
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def load_images(image_dir, num_images):
+    if image_dir:
+        paths = sorted(
+            os.path.join(image_dir, name) for name in os.listdir(image_dir)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )[:num_images]
+        return [Image.open(path).convert("RGB") for path in paths]
+
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)) for _ in range(num_images)]
+
+
+def main():
+    image_dir = sys.argv[1] if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]) else None
+    num_images = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 64
+    images = load_images(image_dir, num_images)
+    print(f"{len(images)} images, {torch.get_num_threads()} CPU threads")
+
+    warmup_models()
+    analyze_image_combined(images[0])
+
+    start = time.perf_counter()
+    for image in images:
+        analyze_image_combined(image)
+    elapsed = time.perf_counter() - start
+    print(f"one at a time   {len(images) / elapsed:8.2f} images/sec")
+
+    for batch_size in (1, 4, 8, 16, 32):
+        start = time.perf_counter()
+        analyze_images_batch(images, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"batch size {batch_size:<4} {len(images) / elapsed:8.2f} images/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_logger.py
+# Per-event cost of log_event as the log grows, to check it stays constant (append-only)
+# instead of growing with the file size (read + rewrite).
+# Usage: python benchmarks/bench_logger.py [num_events] [report_every]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger
+
+RESULT = {"is_harmful": "no", "category": "none", "explanation": "Benchmark event"}
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    report_every = int(sys.argv[2]) if len(sys.argv) > 2 else num_events // 10
+    directory = tempfile.mkdtemp(prefix="bench_logger_")
+    # No rotation, so the single file keeps growing
+    event_log = logger.EventLog(os.path.join(directory, "logs.csv"), rotate_bytes=float("inf"),
+                                rotate_seconds=float("inf"))
+    logger.writer = logger.AsyncLogWriter(event_log, policy="block")
+
+    try:
+        print(f"{'rows':>10} {'us/event':>9} {'file MB':>8}")
+        start = time.perf_counter()
+        for i in range(1, num_events + 1):
+            logger.log_event(f"benchmark message number {i}", RESULT)
+            if i % report_every == 0:
+                # Include the time to drain the queue, so this is the sustained cost per event
+                logger.flush()
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(event_log.path) / 1e6
+                print(f"{i:>10} {elapsed / report_every * 1e6:>9.2f} {size:>8.1f}")
+                start = time.perf_counter()
+        print("writer metrics:", logger.metrics())
+    finally:
+        logger.writer.shutdown()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
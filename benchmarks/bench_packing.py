@@ -0,0 +1,37 @@
+# benchmarks/bench_packing.py
+# Tokens per item and items/sec of check_safety_packed for several pack sizes,
+# to help pick PACK_SIZE. Runs against the offline fake client.
+# Usage: python benchmarks/bench_packing.py [num_texts] [latency_seconds]
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import near_duplicate
+import prefilter
+import rate_limiter
+from fake_client import FakeClient
+from safety_checker import check_safety_packed
+
+
+def main():
+    # Measure the API path, not the pre-filter or cache hits
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    rate_limiter.set_scheduler(None)
+    num_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    texts = [f"hey, are we still meeting at {i % 12 + 1} o'clock?" for i in range(num_texts)]
+
+    print(f"{'pack':>5} {'requests':>9} {'fallbacks':>10} {'tokens/item':>12} {'items/sec':>10}")
+    for pack_size in (1, 5, 10, 20, 50):
+        stats = {}
+        check_safety_packed(texts, pack_size=pack_size, api_client=FakeClient(latency=latency), stats=stats)
+        print(f"{pack_size:>5} {stats['requests']:>9} {stats['fallbacks']:>10} "
+              f"{stats['tokens_per_item']:>12.1f} {stats['items_per_second']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_parser.py
+# Parse success rate and time per response of response_parser vs the previous parsing
+# (json.loads, then a greedy \{.*\} DOTALL regex; the app's ```json fence regex for distress)
+# over a corpus of malformed model outputs of the kinds Gemini actually returns.
+# Usage: python benchmarks/bench_parser.py [repeats]
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_parser
+
+VERDICT = '{"is_harmful": "yes", "category": "violence", "explanation": "Threat to hurt a neighbour"}'
+LONG_EXPLANATION = "The text contains an explicit threat of physical harm. " * 20
+
+CORPUS = [
+    VERDICT,
+    "```json\n" + VERDICT + "\n```",
+    "```JSON\n" + VERDICT + "\n```\n",
+    "Here is the analysis:\n" + VERDICT,
+    VERDICT + "\n\nLet me know if you need anything else.",
+    "```json\n" + VERDICT + "\n```\nNote: the category {violence} was chosen because of the threat.",
+    '{"is_harmful": "Yes.", "category": "violence", "explanation": "Threat",}',
+    '{\n  "is_harmful": "no",\n  "category": "none",\n  "explanation": "A {placeholder} in braces"\n}',
+    '{"is_harmful": true, "category": "self-harm", "explanation": "Mentions ending their life"}',
+    'Analysis {draft}: ' + VERDICT,
+    '{"is_harmful": "yes", "category": "violence", "explanation": "' + LONG_EXPLANATION + '"}',
+    VERDICT + "\n" + VERDICT,
+    '{"is_harmful": "yes", "category": "violence", "explanation": "Threat to hurt',
+    "I cannot analyze this text.",
+]
+
+
+def old_parse(raw):
+    raw = raw.strip()
+    try:
+        result = json.loads(raw)
+        if isinstance(result, dict):
+            return result
+    except ValueError:
+        pass
+    json_match = re.search(r"\{.*\}", raw, re.DOTALL)
+    if json_match:
+        try:
+            result = json.loads(json_match.group())
+            if isinstance(result, dict):
+                return result
+        except ValueError:
+            pass
+    return None
+
+
+def new_parse(raw):
+    return response_parser.extract_json(raw)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, parse in (("old (json.loads + regex)", old_parse), ("response_parser", new_parse)):
+        parsed = sum(parse(raw) is not None for raw in CORPUS)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for raw in CORPUS:
+                parse(raw)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<26} parsed {parsed}/{len(CORPUS)}   {elapsed / (repeats * len(CORPUS)) * 1e6:7.2f} us/response")
+
+    print()
+    for i, raw in enumerate(CORPUS):
+        old, new = old_parse(raw) is not None, new_parse(raw) is not None
+        if old != new:
+            print(f"  #{i:<3} old={'ok' if old else 'FAIL':<4} new={'ok' if new else 'FAIL':<4} {raw[:60]!r}")
+    print(f"\nnormalized: {response_parser.parse_safety(CORPUS[6]).to_dict()}")
+
+
+if __name__ == "__main__":
+    main()
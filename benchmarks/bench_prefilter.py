@@ -0,0 +1,78 @@
+# benchmarks/bench_prefilter.py
+# Share of traffic decided by each check_safety tier (prefilter, cache, near_duplicate, llm)
+# and the latency distribution per tier, on a synthetic traffic mix against the fake client.
+# Usage: python benchmarks/bench_prefilter.py [num_requests] [latency_seconds]
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import near_duplicate
+import rate_limiter
+from fake_client import FakeClient
+from safety_checker import check_safety
+
+GREETINGS = ["hello, how are you?", "thanks a lot!", "see you tomorrow at 5", "good morning everyone",
+             "can you help me with my homework?", "what time is the meeting"]
+HARMFUL = ["I want to kill myself", "kill yourself", "I will kill you if you come here",
+           "nobody would miss you, go die"]
+AMBIGUOUS = ["how do I kill a python process that hangs on startup",
+             "this movie has a lot of blood and violence, is it ok for kids",
+             "I feel so tired of everything lately and I cannot sleep at night",
+             "my neighbour keeps shouting and I am ready to fight him over it"]
+
+
+def make_traffic(n, rng):
+    traffic = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.45:
+            traffic.append(rng.choice(GREETINGS))
+        elif roll < 0.55:
+            traffic.append(rng.choice(HARMFUL))
+        elif roll < 0.8:
+            # Unique ambiguous text, always goes to the model
+            traffic.append(f"{rng.choice(AMBIGUOUS)} (message {i})")
+        else:
+            # Mutated repeat of an ambiguous text
+            traffic.append(rng.choice(AMBIGUOUS).replace(" ", "  ", 1) + "!!")
+    return traffic
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    # Fresh in-memory tiers, so the run neither reads nor pollutes data/
+    cache.set_cache(cache.ResultCache(cache.MemoryCache()))
+    near_duplicate.set_index(near_duplicate.SimHashIndex())
+    # The fake client has no quota, don't throttle it
+    rate_limiter.set_scheduler(None)
+    fake = FakeClient(latency=latency)
+
+    latencies = defaultdict(list)
+    for text in make_traffic(num_requests, random.Random(0)):
+        start = time.perf_counter()
+        result = check_safety(text, api_client=fake)
+        latencies[result["tier"]].append(time.perf_counter() - start)
+
+    print(f"{'tier':<15} {'share':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for tier in ("prefilter", "cache", "near_duplicate", "llm"):
+        values = latencies.get(tier)
+        if not values:
+            continue
+        print(f"{tier:<15} {len(values) / num_requests:>7.1%} "
+              f"{percentile(values, 0.5) * 1000:>9.3f} {percentile(values, 0.99) * 1000:>9.3f}")
+    print(f"model calls: {fake.calls} / {num_requests}")
+
+
+if __name__ == "__main__":
+    main()
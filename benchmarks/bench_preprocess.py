@@ -0,0 +1,53 @@
+# benchmarks/bench_preprocess.py
+# Per-image CPU time spent outside the forward passes: the two separate Hugging Face
+# preprocessing passes (ViT extractor + CLIP processor) vs image_analyzer.preprocess_images.
+# Also prints the largest difference between the two pixel_values, to confirm they agree.
+# Usage: python benchmarks/bench_preprocess.py [num_images]
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_analyzer import preprocess_images, warmup_models
+from model_registry import registry
+
+
+def main():
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rng = np.random.default_rng(0)
+    # Mix of landscape, portrait and square photos
+    shapes = [(480, 640), (640, 480), (512, 512)]
+    images = [
+        Image.fromarray(rng.integers(0, 256, (*shapes[i % len(shapes)], 3), dtype=np.uint8))
+        for i in range(num_images)
+    ]
+
+    warmup_models()
+    extractor, _ = registry.get("emotion")
+    clip_processor, _ = registry.get("clip")
+
+    start = time.perf_counter()
+    hf_vit = extractor(images=images, return_tensors="pt")["pixel_values"]
+    hf_clip = clip_processor(images=images, return_tensors="pt")["pixel_values"]
+    hf_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vit, clip = preprocess_images(images)
+    shared_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preprocess_images(images, shared_resize=True)
+    single_resize_elapsed = time.perf_counter() - start
+
+    print(f"huggingface processors  {hf_elapsed / num_images * 1000:8.2f} ms/image")
+    print(f"preprocess_images       {shared_elapsed / num_images * 1000:8.2f} ms/image")
+    print(f"  shared_resize=True    {single_resize_elapsed / num_images * 1000:8.2f} ms/image")
+    print(f"max abs diff vit={float((hf_vit - vit).abs().max()):.4f} clip={float((hf_clip - clip).abs().max()):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_rate_limiter.py
+# Simulated-failure harness for rate_limiter.GeminiScheduler against the fake client:
+#   burst     - N concurrent calls under a requests-per-minute limit: achieved rate vs the limit
+#   flaky     - a share of calls fail with 503: how many still succeed, and at what retry cost
+#   quota     - 429s carrying a retryDelay: the scheduler waits at least that long
+#   outage    - the API is down for a while: the circuit opens, fails fast, then recovers
+# Usage: python benchmarks/bench_rate_limiter.py [num_calls]
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_client import FakeClient, api_error
+from rate_limiter import CircuitBreaker, CircuitOpenError, GeminiScheduler, TokenBucket
+
+
+def run(scheduler, fake, num_calls, concurrency=16):
+    def one(i):
+        try:
+            scheduler.call(fake.models.generate_content, model="fake", contents=f"message {i}")
+            return "ok"
+        except CircuitOpenError:
+            return "rejected"
+        except Exception:
+            return "failed"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(num_calls)))
+    elapsed = time.perf_counter() - start
+    return {name: outcomes.count(name) for name in ("ok", "failed", "rejected")}, elapsed
+
+
+def report(name, outcomes, elapsed, scheduler, fake):
+    counters = scheduler.stats()
+    print(f"{name:<8} ok={outcomes['ok']:<5} failed={outcomes['failed']:<4} rejected={outcomes['rejected']:<4} "
+          f"api_calls={fake.calls:<5} retries={counters['retries']:<4} "
+          f"backoff={counters['backoff_seconds']:.2f}s throttled={counters['throttled_seconds']:.2f}s "
+          f"elapsed={elapsed:.2f}s circuit={counters['circuit']}")
+
+
+def main():
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    # 600 requests/minute with a burst capacity of 10: after the first 10 calls, 10 per second
+    rpm = 600
+    scheduler = GeminiScheduler(rpm=rpm, tpm=0)
+    scheduler.requests = TokenBucket(rpm, capacity=10)
+    fake = FakeClient(latency=0.01)
+    outcomes, elapsed = run(scheduler, fake, min(num_calls, 50))
+    report("burst", outcomes, elapsed, scheduler, fake)
+    print(f"         achieved {sum(outcomes.values()) / elapsed * 60:.0f} req/min, limit {rpm} (+ burst of 10)")
+
+    scheduler = GeminiScheduler(rpm=0, tpm=0, max_retries=5, backoff_base=0.01)
+    fake = FakeClient(latency=0.01, failure_rate=0.3)
+    outcomes, elapsed = run(scheduler, fake, num_calls)
+    report("flaky", outcomes, elapsed, scheduler, fake)
+
+    retry_delay = 0.2
+    scheduler = GeminiScheduler(rpm=0, tpm=0, max_retries=3, backoff_base=0.01)
+    fake = FakeClient(latency=0.01, failure_rate=0.5, failure_code=429, retry_delay=retry_delay)
+    outcomes, elapsed = run(scheduler, fake, min(num_calls, 50))
+    report("quota", outcomes, elapsed, scheduler, fake)
+    assert scheduler.counters["backoff_seconds"] >= retry_delay * scheduler.counters["retries"]
+
+    # Every call fails for 0.5s, the API is healthy afterwards
+    outage_end = time.monotonic() + 0.5
+    scheduler = GeminiScheduler(rpm=0, tpm=0, max_retries=1, backoff_base=0.01,
+                                breaker=CircuitBreaker(failure_threshold=5, reset_seconds=0.2))
+    fake = FakeClient(latency=0.01, failures=lambda call: api_error(503) if time.monotonic() < outage_end else None)
+    outcomes, elapsed = run(scheduler, fake, num_calls, concurrency=4)
+    report("outage", outcomes, elapsed, scheduler, fake)
+    time.sleep(max(0.0, outage_end - time.monotonic()) + 0.2)
+    outcomes, elapsed = run(scheduler, fake, 20, concurrency=1)
+    report("recover", outcomes, elapsed, scheduler, fake)
+
+
+if __name__ == "__main__":
+    main()
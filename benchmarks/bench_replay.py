@@ -0,0 +1,145 @@
+# benchmarks/bench_replay.py
+# End-to-end latency and throughput of the app.py "Analyze Text" flow (check_safety and
+# analyze_text_for_distress in parallel, a streamed fix_text rewrite for harmful text, log_event),
+# replayed from a cassette (see replay.py), so it runs the same way on a disconnected machine.
+#
+#   python benchmarks/bench_replay.py record [--fake]                 # calls the real API (or FakeClient)
+#   python benchmarks/bench_replay.py replay [--latency L] [--users N ...]
+#
+# L is recorded (default), none, seconds, or lognormal:<median>[:<sigma>]. With --latency none the
+# numbers are the app's own overhead; with recorded they reproduce the recorded run.
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import gemini_client
+import logger
+import near_duplicate
+import prefilter
+import rate_limiter
+import replay
+from fixer import fix_text_stream
+from orchestrator import run_text_analysis
+from safety_checker import check_safety
+from text_analyzer import analyze_text_for_distress
+
+CASSETTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "app_flow.cassette.jsonl")
+
+SAMPLE_TEXTS = [
+    "hello, how are you?",
+    "I will kill you if you come here again",
+    "I feel so tired of everything lately and I cannot sleep at night",
+    "how do I kill a python process that hangs on startup",
+    "nobody would miss me if I was gone",
+    "this movie has a lot of blood and violence, is it ok for kids",
+    "my neighbour keeps shouting and I am ready to fight him over it",
+    "thanks for your help yesterday, it really made my day",
+    "people like them should not be allowed in this country",
+    "I failed my exam again, I am so stupid"
+]
+
+
+def fake_responder(prompt):
+    harmful = any(word in prompt for word in ("kill you", "fight him", "should not be allowed"))
+    if "psychological safety evaluator" in prompt:
+        return json.dumps({"sentiment": "negative", "risk_level": "medium", "explanation": "Fake response",
+                           "recommended_actions": ["Talk to someone you trust"]})
+    if "safety analysis tool" in prompt:
+        return json.dumps({"is_harmful": "yes" if harmful else "no", "category": "violence" if harmful else "none",
+                           "explanation": "Fake response"})
+    return "I am very upset about this and would like to talk about it calmly. " * 3
+
+
+def run_flow(text):
+    """
+    One text through the same stages as the Analyze Text button in app.py.
+    Returns (seconds to the safety verdict, seconds until every stage finished).
+    """
+    start = time.perf_counter()
+    to_safety = None
+    for event in run_text_analysis(text, safety_fn=check_safety, distress_fn=analyze_text_for_distress,
+                                   fix_fn=fix_text_stream):
+        if event["stage"] == "safety" and not event.get("partial"):
+            to_safety = time.perf_counter() - start
+            if "error" not in event["result"]:
+                logger.log_event(text, event["result"])
+    return to_safety, time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def record(args):
+    if os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    if args.fake:
+        from fake_client import FakeClient
+        rate_limiter.set_scheduler(None)
+        inner = FakeClient(latency=replay.lognormal_latency(0.4, seed=1), responder=fake_responder,
+                           chunk_size=40, chunk_delay=0.03)
+    else:
+        inner = gemini_client.create_client()
+    gemini_client.set_client(replay.RecordingClient(inner, args.cassette))
+    for text in SAMPLE_TEXTS:
+        run_flow(text)
+    print(f"Recorded {len(SAMPLE_TEXTS)} texts to {args.cassette}")
+
+
+def run_replay(args):
+    if not os.path.exists(args.cassette):
+        sys.exit(f"No cassette at {args.cassette}, record one first: python {sys.argv[0]} record [--fake]")
+    # The rate limiter would pace replayed calls like real ones; measure the app instead
+    rate_limiter.set_scheduler(None)
+    print(f"{'users':>5}{'texts':>7}{'texts/s':>9}{'safety p50':>12}{'p99':>8}{'total p50':>11}{'p99':>8}")
+    for users in args.users:
+        client = replay.ReplayClient(args.cassette, latency=replay.parse_latency(args.latency))
+        gemini_client.set_client(client)
+        texts = SAMPLE_TEXTS * args.rounds
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            timings = list(pool.map(run_flow, texts))
+        elapsed = time.perf_counter() - start
+        to_safety = [t[0] for t in timings]
+        totals = [t[1] for t in timings]
+        print(f"{users:>5}{len(texts):>7}{len(texts) / elapsed:>9.1f}"
+              f"{statistics.median(to_safety) * 1000:>10.0f}ms{percentile(to_safety, 0.99) * 1000:>6.0f}ms"
+              f"{statistics.median(totals) * 1000:>9.0f}ms{percentile(totals, 0.99) * 1000:>6.0f}ms")
+        if client.misses:
+            print(f"      {client.misses} calls had no recording; re-record the cassette")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark of the app.py text analysis flow")
+    parser.add_argument("command", choices=["record", "replay"])
+    parser.add_argument("--cassette", default=CASSETTE)
+    parser.add_argument("--fake", action="store_true", help="record against FakeClient instead of the API")
+    parser.add_argument("--latency", default="recorded", help="recorded, none, seconds or lognormal:<median>")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4], help="concurrent texts")
+    parser.add_argument("--rounds", type=int, default=3, help="times each sample text is analyzed")
+    args = parser.parse_args()
+
+    # Every text must reach the API in both record and replay, so no local tiers
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    logger.writer = logger.AsyncLogWriter(logger.EventLog(os.path.join(tempfile.mkdtemp(), "logs.csv")))
+
+    if args.command == "record":
+        record(args)
+    else:
+        run_replay(args)
+    logger.writer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
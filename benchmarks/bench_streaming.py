@@ -0,0 +1,47 @@
+# benchmarks/bench_streaming.py
+# Time to first chunk of fixer.fix_text_stream vs the full-response latency of fix_text,
+# against the fake client streaming a long rewrite.
+# Usage: python benchmarks/bench_streaming.py [num_texts] [first_chunk_latency] [chunk_delay]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import rate_limiter
+from fake_client import FakeClient
+from fixer import fix_text, fix_text_stream
+
+REWRITE = ("I am really frustrated with my neighbour, who keeps shouting late at night. "
+           "I would like to talk to them calmly, or ask the building manager for help. ") * 4
+
+
+def main():
+    cache.set_cache(None)
+    rate_limiter.set_scheduler(None)
+    num_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+    chunk_delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    fake = FakeClient(latency=latency, responder=lambda prompt: REWRITE, chunk_size=40, chunk_delay=chunk_delay)
+
+    first_chunks, totals = [], []
+    for i in range(num_texts):
+        start = time.perf_counter()
+        for n, chunk in enumerate(fix_text_stream(f"text {i}", api_client=fake)):
+            if n == 0:
+                first_chunks.append(time.perf_counter() - start)
+        totals.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(num_texts):
+        fix_text(f"text {i}", api_client=fake)
+    blocking = (time.perf_counter() - start) / num_texts
+
+    print(f"fix_text_stream  first chunk {sum(first_chunks) / num_texts * 1000:7.0f} ms"
+          f"   full {sum(totals) / num_texts * 1000:7.0f} ms")
+    print(f"fix_text         full        {blocking * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
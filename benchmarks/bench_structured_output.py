@@ -0,0 +1,104 @@
+# benchmarks/bench_structured_output.py
+# Free-form JSON prompts vs schema-constrained output (response_mime_type=application/json plus
+# a response schema, see gemini_client.json_config): parse-failure rate and output tokens per call.
+#
+#   python benchmarks/bench_structured_output.py record [num_texts]   # calls the real API
+#   python benchmarks/bench_structured_output.py report [fixtures]    # offline, from the recording
+#
+# record sends every sample text through the safety and distress prompts in both modes and saves
+# the raw responses with their token usage to FIXTURES, so report can be re-run (e.g. after a
+# parser change) without API calls.
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "structured_output.jsonl")
+
+SAMPLE_TEXTS = [
+    "hello, how are you?",
+    "I will kill you if you come here again",
+    "I feel so tired of everything lately and I cannot sleep at night",
+    "how do I kill a python process that hangs on startup",
+    "nobody would miss me if I was gone",
+    "this movie has a lot of blood and violence, is it ok for kids",
+    "my neighbour keeps shouting and I am ready to fight him over it",
+    "thanks for your help yesterday, it really made my day",
+    "people like them should not be allowed in this country",
+    "I failed my exam again, I am so stupid"
+]
+
+
+def record(num_texts):
+    import gemini_client
+    import rate_limiter
+    import safety_checker
+    import text_analyzer
+
+    kinds = {
+        "safety": (safety_checker.MODEL_NAME, safety_checker._build_prompt, response_parser.SAFETY_SCHEMA),
+        "distress": (text_analyzer.MODEL_NAME, text_analyzer._build_prompt, response_parser.DISTRESS_SCHEMA)
+    }
+    client = gemini_client.get_client()
+    os.makedirs(os.path.dirname(FIXTURES), exist_ok=True)
+    with open(FIXTURES, "w", encoding="utf-8") as f:
+        for text in (SAMPLE_TEXTS * (num_texts // len(SAMPLE_TEXTS) + 1))[:num_texts]:
+            for kind, (model, build_prompt, schema) in kinds.items():
+                for mode in ("freeform", "schema"):
+                    config = gemini_client.types.GenerateContentConfig(
+                        response_mime_type="application/json", response_schema=schema
+                    ) if mode == "schema" else None
+                    start = time.perf_counter()
+                    response = rate_limiter.generate_content(client, model, build_prompt(text), config=config)
+                    usage = response.usage_metadata
+                    f.write(json.dumps({
+                        "kind": kind, "mode": mode, "text": text, "response": response.text,
+                        "output_tokens": usage.candidates_token_count, "prompt_tokens": usage.prompt_token_count,
+                        "seconds": time.perf_counter() - start
+                    }) + "\n")
+    print(f"Recorded {num_texts} texts x 2 kinds x 2 modes to {FIXTURES}")
+
+
+def report(path):
+    if not os.path.exists(path):
+        sys.exit(f"No fixtures at {path}, record them first: python {sys.argv[0]} record")
+    parsers = {"safety": response_parser.parse_safety, "distress": response_parser.parse_distress}
+    rows = defaultdict(lambda: {"calls": 0, "direct_json": 0, "parse_failures": 0, "output_tokens": 0, "seconds": 0.0})
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fixture = json.loads(line)
+            row = rows[(fixture["kind"], fixture["mode"])]
+            row["calls"] += 1
+            try:
+                json.loads(fixture["response"])
+                row["direct_json"] += 1
+            except ValueError:
+                pass
+            row["parse_failures"] += parsers[fixture["kind"]](fixture["response"]).parse_error
+            row["output_tokens"] += fixture["output_tokens"] or 0
+            row["seconds"] += fixture["seconds"]
+
+    print(f"{'kind':<9}{'mode':<10}{'calls':>6}{'plain json':>12}{'parse fail':>12}{'out tok/call':>14}{'ms/call':>9}")
+    for (kind, mode), row in sorted(rows.items()):
+        calls = row["calls"]
+        print(f"{kind:<9}{mode:<10}{calls:>6}{row['direct_json'] / calls:>12.0%}{row['parse_failures'] / calls:>12.0%}"
+              f"{row['output_tokens'] / calls:>14.1f}{row['seconds'] / calls * 1000:>9.0f}")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "record":
+        record(int(sys.argv[2]) if len(sys.argv) > 2 else len(SAMPLE_TEXTS))
+    elif command == "report":
+        report(sys.argv[2] if len(sys.argv) > 2 else FIXTURES)
+    else:
+        sys.exit(f"Usage: python {sys.argv[0]} [record [num_texts] | report [fixtures]]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_telemetry.py
+# Cost of the instrumentation (telemetry.py) when disabled and enabled: per span / counter, and
+# per check_safety call end to end against a zero-latency fake client (prefilter and caches off,
+# so every call goes through the rate limiter and the parser). Prints the resulting metrics too.
+# Usage: python benchmarks/bench_telemetry.py [iterations] [calls]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import near_duplicate
+import prefilter
+import rate_limiter
+import telemetry
+from fake_client import FakeClient
+from safety_checker import check_safety
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def empty_span():
+    with telemetry.span("bench.span", size=1):
+        pass
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    # High limits, so the scheduler is in the path but never waits
+    rate_limiter.set_scheduler(rate_limiter.GeminiScheduler(rpm=0, tpm=0))
+    fake = FakeClient(latency=0.0)
+    texts = [f"benchmark message number {i}" for i in range(calls)]
+
+    print(f"{'':<12}{'span us':>9}{'count us':>10}{'check_safety us':>17}")
+    for enabled in (False, True):
+        telemetry.enable(enabled)
+        telemetry.reset()
+        span_us = per_call_us(empty_span, iterations)
+        count_us = per_call_us(lambda: telemetry.count("bench_total", kind="x"), iterations)
+        # Spans of the loop above are kept for export; start from an empty buffer
+        telemetry.reset()
+        start = time.perf_counter()
+        for text in texts:
+            check_safety(text, api_client=fake)
+        safety_us = (time.perf_counter() - start) / calls * 1e6
+        print(f"{'enabled' if enabled else 'disabled':<12}{span_us:>9.2f}{count_us:>10.2f}{safety_us:>17.1f}")
+
+    print()
+    # Bucket lines left out for brevity
+    print("\n".join(line for line in telemetry.prometheus_text().splitlines() if "_bucket{" not in line))
+    spans = telemetry.finished_spans()
+    print(f"{len(spans)} spans, e.g. {spans[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/compare_backends.py
+# Accuracy vs latency of the image inference backends (torch fp32, int8, onnx) on a local
+# image set: per-image latency and top-label agreement with the fp32 baseline.
+# Usage: python benchmarks/compare_backends.py <image_dir> [batch_size] [backends...]
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import inference_backends
+from image_analyzer import analyze_images_batch, warmup_models
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def main():
+    if len(sys.argv) < 2 or not os.path.isdir(sys.argv[1]):
+        sys.exit("Usage: python benchmarks/compare_backends.py <image_dir> [batch_size] [backends...]")
+    image_dir = sys.argv[1]
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    backends = sys.argv[3:] or list(inference_backends.BACKENDS)
+
+    paths = sorted(os.path.join(image_dir, name) for name in os.listdir(image_dir)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    images = [Image.open(path).convert("RGB") for path in paths]
+    if not images:
+        sys.exit(f"No images found in {image_dir}")
+    warmup_models()
+
+    baseline = None
+    print(f"{len(images)} images, batch size {batch_size}")
+    print(f"{'backend':<8} {'ms/image':>9} {'emotion agree':>14} {'risk agree':>11}")
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        # First call builds the runner (quantization / ONNX export), keep it out of the timing
+        analyze_images_batch(images[:1], backend=backend)
+        start = time.perf_counter()
+        results = analyze_images_batch(images, batch_size=batch_size, backend=backend)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = results
+        emotion_agree = sum(r["emotion"]["top_label"] == b["emotion"]["top_label"] for r, b in zip(results, baseline))
+        risk_agree = sum(r["risk"]["top_label"] == b["risk"]["top_label"] for r, b in zip(results, baseline))
+        print(f"{backend:<8} {elapsed / len(images) * 1000:>9.2f} "
+              f"{emotion_agree / len(images):>14.1%} {risk_agree / len(images):>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
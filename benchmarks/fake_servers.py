@@ -0,0 +1,144 @@
+# benchmarks/fake_servers.py
+# Local HTTP stand-ins for the external services, so benchmarks exercise the real client
+# libraries (google-genai, boto3) end to end without network access or credentials.
+#   FakeGeminiServer - answers generateContent / streamGenerateContent like the Gemini API
+#                      (point gemini_client.create_client(base_url=server.url) at it)
+#   FakeSESServer    - answers the SES SendEmail query API like AWS
+#                      (point boto3.client("ses", endpoint_url=server.url) at it)
+# Both sleep a fixed latency per request and count the requests they served.
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_client import default_responder
+
+SES_RESPONSE = """<SendEmailResponse xmlns="http://ses.amazonaws.com/doc/2010-12-01/">
+  <SendEmailResult><MessageId>{message_id}</MessageId></SendEmailResult>
+  <ResponseMetadata><RequestId>{request_id}</RequestId></ResponseMetadata>
+</SendEmailResponse>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real services
+    protocol_version = "HTTP/1.1"
+    # TCP_NODELAY: with Nagle on, a small response held back behind the client's delayed ACK
+    # adds ~40 ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _FakeServer:
+    handler = _Handler
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        fake = self
+
+        class Handler(self.handler):
+            server_state = fake
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def served(self):
+        with self._count_lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _GeminiHandler(_Handler):
+    def do_POST(self):
+        request = json.loads(self._read_body() or b"{}")
+        self.server_state.served()
+        prompt = "".join(part.get("text", "") for content in request.get("contents", [])
+                         for part in content.get("parts", []))
+        text = self.server_state.responder(prompt)
+        if ":streamGenerateContent" in self.path:
+            chunks = [text[i:i + 40] for i in range(0, len(text), 40)] or [""]
+            body = "".join(f"data: {json.dumps(self._response(prompt, chunk))}\r\n\r\n" for chunk in chunks)
+            self._send(body, "text/event-stream")
+        elif ":generateContent" in self.path:
+            self._send(json.dumps(self._response(prompt, text)), "application/json")
+        else:
+            self.send_error(404)
+
+    @staticmethod
+    def _response(prompt, text):
+        prompt_tokens, output_tokens = max(1, len(prompt) // 4), max(1, len(text) // 4)
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+                              "totalTokenCount": prompt_tokens + output_tokens}
+        }
+
+
+class FakeGeminiServer(_FakeServer):
+    """
+    responder: function(prompt) -> response text (default: fake_client.default_responder).
+    """
+    handler = _GeminiHandler
+
+    def __init__(self, latency=0.0, responder=None):
+        super().__init__(latency)
+        self.responder = responder or default_responder
+
+
+class _SESHandler(_Handler):
+    def do_POST(self):
+        params = parse_qs(self._read_body().decode("utf-8"))
+        self.server_state.served()
+        if params.get("Action") != ["SendEmail"]:
+            self.send_error(400)
+            return
+        self.server_state.sent.append(params.get("Destination.ToAddresses.member.1", [""])[0])
+        self._send(SES_RESPONSE.format(message_id=uuid.uuid4(), request_id=uuid.uuid4()), "text/xml")
+
+
+class FakeSESServer(_FakeServer):
+    """
+    .sent lists the recipient of every email accepted.
+    """
+    handler = _SESHandler
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.sent = []
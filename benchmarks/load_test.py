@@ -0,0 +1,148 @@
+# benchmarks/load_test.py
+# Load test of server.py against local fakes: the Gemini calls go to FakeClient and the image
+# models are replaced by a function with a fixed per-batch overhead plus a per-image cost, so
+# the effect of micro-batching is visible without loading the real models.
+# Prints p50/p99 latency and throughput per endpoint and concurrency level.
+# Usage: python benchmarks/load_test.py [requests_per_level] [api_latency_seconds]
+import asyncio
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from functools import partial
+
+import httpx
+import uvicorn
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import near_duplicate
+import prefilter
+import rate_limiter
+from fake_client import FakeClient
+from safety_checker import check_safety_async
+from server import create_app
+
+# Rough CPU cost of the image models: one forward pass has a fixed overhead, then grows per image
+IMAGE_BATCH_OVERHEAD = 0.030
+IMAGE_PER_IMAGE = 0.004
+# Same shape as an analyze_images_batch result: per-label probabilities plus the top label
+FAKE_IMAGE_RESULT = {
+    "emotion": {
+        "result": {"neutral": 0.86, "happy": 0.05, "surprised": 0.02, "sad": 0.02, "angry": 0.02,
+                   "disgust": 0.01, "fear": 0.01, "contempt": 0.01},
+        "top_label": "neutral",
+        "top_prob": 0.86,
+        "description": "Neutral, without strong emotions."
+    },
+    "risk": {
+        "result": {"safe": 0.9, "violent": 0.02, "sexual": 0.02, "graphic": 0.02, "neutral": 0.04},
+        "top_label": "safe",
+        "top_prob": 0.9,
+        "description": "The image appears safe for general viewing."
+    }
+}
+
+
+def fake_image_batch(images):
+    time.sleep(IMAGE_BATCH_OVERHEAD + IMAGE_PER_IMAGE * len(images))
+    return [FAKE_IMAGE_RESULT for _ in images]
+
+
+def fake_distress(latency, text):
+    time.sleep(latency)
+    return {"distress_level": "low", "explanation": "Fake response"}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_level(client, send, num_requests, concurrency):
+    latencies = []
+    remaining = iter(range(num_requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await send(client)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+async def main_async(base_url, num_requests, app):
+    image = io.BytesIO()
+    Image.new("RGB", (640, 480), (120, 90, 60)).save(image, format="PNG")
+    image_bytes = image.getvalue()
+
+    endpoints = {
+        "text/safety": lambda c: c.post("/v1/text/safety", json={"text": "sample message"}),
+        "text/distress": lambda c: c.post("/v1/text/distress", json={"text": "sample message"}),
+        "image/analyze": lambda c: c.post("/v1/image/analyze", content=image_bytes,
+                                          headers={"Content-Type": "application/octet-stream"})
+    }
+    print(f"{'endpoint':<15}{'conc':>6}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'mean batch':>12}")
+    for name, send in endpoints.items():
+        for concurrency in (1, 8, 32, 128):
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                before = dict(app.state.batcher.counters)
+                latencies, elapsed = await run_level(client, send, num_requests, concurrency)
+            batches = app.state.batcher.counters["batches"] - before["batches"]
+            mean_batch = (app.state.batcher.counters["items"] - before["items"]) / batches if batches else 0
+            batch_column = f"{mean_batch:12.1f}" if batches else f"{'-':>12}"
+            print(f"{name:<15}{concurrency:>6}{_percentile(latencies, 0.5) * 1000:10.1f}"
+                  f"{_percentile(latencies, 0.99) * 1000:10.1f}{num_requests / elapsed:10.1f}{batch_column}")
+
+
+def main():
+    # Measure the API path, not the pre-filter or cache hits
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    rate_limiter.set_scheduler(None)
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    fake = FakeClient(latency=latency)
+    app = create_app(
+        safety_fn=partial(check_safety_async, api_client=fake),
+        distress_fn=partial(fake_distress, latency),
+        image_batch_fn=fake_image_batch
+    )
+    server, thread, base_url = start_server(app)
+    try:
+        asyncio.run(main_async(base_url, num_requests, app))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
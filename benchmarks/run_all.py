@@ -0,0 +1,318 @@
+# benchmarks/run_all.py
+# Benchmark suite over the hot paths, with a JSON report that can be compared across versions.
+#   check_safety    latency and throughput through the real google-genai client against a local
+#                   fake model server (benchmarks/fake_servers.py)
+#   image_batch     analyze_image_combined and analyze_images_batch images/sec at several batch sizes
+#   log_event       per-event cost of log_event as the log file grows
+#   notify_contact  latency and throughput through boto3 against a local SES stand-in
+# Inputs, latencies and seeds are fixed, so runs on the same machine are comparable.
+#
+#   python benchmarks/run_all.py [--quick] [--scenarios check_safety log_event ...] [--out report.json]
+#   python benchmarks/run_all.py --compare benchmarks/results/<old>.json [--threshold 0.1]
+#
+# The report goes to benchmarks/results/<commit>.json by default. With --compare, metrics that got
+# worse by more than --threshold are listed and the exit code is 1. Metrics named *_per_sec are
+# better when higher, every other metric when lower.
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_servers import FakeGeminiServer, FakeSESServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _latency_metrics(prefix, seconds):
+    return {
+        f"{prefix}_p50_ms": statistics.median(seconds) * 1000,
+        f"{prefix}_p99_ms": _percentile(seconds, 0.99) * 1000
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+# ------------------- Scenarios -------------------
+
+def bench_check_safety(quick):
+    import cache
+    import gemini_client
+    import near_duplicate
+    import prefilter
+    import rate_limiter
+    from safety_checker import check_safety, check_safety_async
+
+    calls, concurrency, latency = (50, 8, 0.02) if quick else (300, 16, 0.05)
+    # Every call goes to the model: no local tiers, no client-side rate limit
+    prefilter.ENABLED = False
+    cache.set_cache(None)
+    near_duplicate.set_index(None)
+    rate_limiter.set_scheduler(None)
+    texts = [f"benchmark message number {i}" for i in range(calls)]
+
+    with FakeGeminiServer(latency=latency) as server:
+        gemini_client.set_client(gemini_client.create_client(api_key="benchmark", base_url=server.url))
+        try:
+            check_safety("warm up the connection pool")
+            sequential = [_timed(check_safety, text) for text in texts]
+            results = []
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                start = time.perf_counter()
+                results.extend(pool.map(check_safety, texts))
+                threaded = time.perf_counter() - start
+
+            async def run_async():
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def one(text):
+                    async with semaphore:
+                        return await check_safety_async(text)
+                return await asyncio.gather(*(one(text) for text in texts))
+
+            start = time.perf_counter()
+            results.extend(asyncio.run(run_async()))
+            concurrent_async = time.perf_counter() - start
+        finally:
+            gemini_client.set_client(None)
+
+    return {
+        "params": {"calls": calls, "concurrency": concurrency, "server_latency_ms": latency * 1000},
+        "metrics": {
+            **_latency_metrics("latency", sequential),
+            "overhead_p50_ms": (statistics.median(sequential) - latency) * 1000,
+            "threaded_texts_per_sec": calls / threaded,
+            "async_texts_per_sec": calls / concurrent_async,
+            "errors": sum(result.get("is_harmful") == "unknown" for result in results)
+        }
+    }
+
+
+def bench_image_batch(quick):
+    import numpy as np
+    from PIL import Image
+
+    from image_analyzer import analyze_image_combined, analyze_images_batch, warmup_models
+
+    num_images, batch_sizes = (8, (1, 4, 8)) if quick else (64, (1, 4, 8, 16, 32))
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)) for _ in range(num_images)]
+    warmup_models()
+    analyze_image_combined(images[0])
+
+    start = time.perf_counter()
+    for image in images:
+        analyze_image_combined(image)
+    metrics = {"single_images_per_sec": num_images / (time.perf_counter() - start)}
+    for batch_size in batch_sizes:
+        elapsed = _timed(lambda: analyze_images_batch(images, batch_size=batch_size))
+        metrics[f"batch_{batch_size}_images_per_sec"] = num_images / elapsed
+    return {"params": {"images": num_images, "batch_sizes": list(batch_sizes), "size": "640x480"},
+            "metrics": metrics}
+
+
+def bench_log_event(quick):
+    import logger
+
+    num_events, checkpoints = (20_000, 4) if quick else (500_000, 5)
+    result = {"is_harmful": "no", "category": "none", "explanation": "Benchmark event"}
+    directory = tempfile.mkdtemp(prefix="bench_log_event_")
+    # No rotation, so the single file keeps growing
+    event_log = logger.EventLog(os.path.join(directory, "logs.csv"), rotate_bytes=float("inf"),
+                                rotate_seconds=float("inf"))
+    previous_writer = logger.writer
+    logger.writer = logger.AsyncLogWriter(event_log, policy="block")
+    per_event = []
+    try:
+        report_every = num_events // checkpoints
+        start = time.perf_counter()
+        for i in range(1, num_events + 1):
+            logger.log_event(f"benchmark message number {i}", result)
+            if i % report_every == 0:
+                # Include draining the queue, so this is the sustained cost per event
+                logger.flush()
+                per_event.append((time.perf_counter() - start) / report_every * 1e6)
+                start = time.perf_counter()
+        file_mb = os.path.getsize(event_log.path) / 1e6
+    finally:
+        logger.writer.shutdown()
+        logger.writer = previous_writer
+        shutil.rmtree(directory)
+
+    return {
+        "params": {"events": num_events, "checkpoints": checkpoints},
+        "metrics": {
+            "first_us_per_event": per_event[0],
+            "last_us_per_event": per_event[-1],
+            # ~1.0 when the cost does not grow with the file
+            "growth_ratio": per_event[-1] / per_event[0],
+            "file_mb": file_mb
+        }
+    }
+
+
+def bench_notify_contact(quick):
+    import boto3
+
+    import notifier
+
+    sends, concurrency, latency = (30, 4, 0.01) if quick else (200, 8, 0.02)
+    previous_from = notifier.FROM_EMAIL
+    notifier.FROM_EMAIL = "benchmark@example.com"
+    with FakeSESServer(latency=latency) as server:
+        notifier.set_ses_client(boto3.client(
+            "ses", region_name="eu-west-1", endpoint_url=server.url,
+            aws_access_key_id="benchmark", aws_secret_access_key="benchmark"
+        ))
+        recipients = [f"contact{i}@example.com" for i in range(sends)]
+        try:
+            # notify_contact prints every message id
+            with contextlib.redirect_stdout(io.StringIO()):
+                notifier.notify_contact(recipients[0], "warm up")
+                sequential = [_timed(notifier.notify_contact, to, "Benchmark alert") for to in recipients]
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    start = time.perf_counter()
+                    sent = list(pool.map(lambda to: notifier.notify_contact(to, "Benchmark alert"), recipients))
+                    threaded = time.perf_counter() - start
+        finally:
+            notifier.set_ses_client(None)
+            notifier.FROM_EMAIL = previous_from
+
+    return {
+        "params": {"sends": sends, "concurrency": concurrency, "server_latency_ms": latency * 1000},
+        "metrics": {
+            **_latency_metrics("latency", sequential),
+            "overhead_p50_ms": (statistics.median(sequential) - latency) * 1000,
+            "threaded_emails_per_sec": sends / threaded,
+            "errors": sends - sum(sent)
+        }
+    }
+
+
+SCENARIOS = {
+    "check_safety": bench_check_safety,
+    "image_batch": bench_image_batch,
+    "log_event": bench_log_event,
+    "notify_contact": bench_notify_contact
+}
+
+
+# ------------------- Report -------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(names, quick):
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.utcnow().isoformat(),
+        "quick": quick,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "scenarios": {}
+    }
+    for name in names:
+        print(f"running {name} ...", flush=True)
+        start = time.perf_counter()
+        try:
+            scenario = SCENARIOS[name](quick)
+        except Exception as e:
+            # e.g. the image models cannot be downloaded; the other scenarios still run
+            scenario = {"error": f"{type(e).__name__}: {e}"}
+        scenario["seconds"] = time.perf_counter() - start
+        report["scenarios"][name] = scenario
+        for metric, value in scenario.get("metrics", {}).items():
+            print(f"  {metric:<28}{value:>12.2f}")
+        if "error" in scenario:
+            print(f"  failed: {scenario['error']}")
+    return report
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_sec")
+
+
+def compare(report, baseline, threshold):
+    """
+    Print every metric next to its baseline value; returns the list of regressions.
+    """
+    if report.get("quick") != baseline.get("quick"):
+        print("warning: comparing a --quick run with a full run")
+    regressions = []
+    print(f"{'scenario':<16}{'metric':<28}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, scenario in report["scenarios"].items():
+        old_metrics = baseline.get("scenarios", {}).get(name, {}).get("metrics", {})
+        for metric, value in scenario.get("metrics", {}).items():
+            old = old_metrics.get(metric)
+            if old is None:
+                continue
+            if old:
+                # abs(): overhead metrics can be negative from noise, and dividing by a negative
+                # baseline would flip the sign and report a regression as an improvement
+                change = (value - old) / abs(old)
+            else:
+                # e.g. errors going from 0 to 3
+                change = 0.0 if value == old else float("inf") if value > old else float("-inf")
+            worse = -change if higher_is_better(metric) else change
+            flag = ""
+            if worse > threshold:
+                regressions.append((name, metric, old, value))
+                flag = "  REGRESSION"
+            print(f"{name:<16}{metric:<28}{old:>12.2f}{value:>12.2f}{change:>+9.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the text, image, logging and notification paths")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast check")
+    parser.add_argument("--out", help="report path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="report of an earlier version to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    report = run(args.scenarios, args.quick)
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['commit']}{'-quick' if args.quick else ''}.json")
+    directory = os.path.dirname(out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
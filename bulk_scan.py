@@ -0,0 +1,228 @@
+# bulk_scan.py
+# Headless bulk moderation of text and image corpora, without the Streamlit UI.
+#
+#   python bulk_scan.py --texts messages.jsonl --out results.jsonl
+#   python bulk_scan.py --texts messages.csv --text-field body --id-field msg_id --out results.jsonl
+#   python bulk_scan.py --images photos/ --out results.jsonl --batch-size 16
+#
+# Inputs are streamed and results are appended to the output file as they complete, so memory
+# stays flat regardless of input size. The output doubles as the checkpoint: re-running the
+# same command after a crash skips every id already present in it, except results that failed
+# with an API or parse error (e.g. while the circuit breaker was open), which are retried.
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def _json_rows(f):
+    for line in f:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+
+
+def iter_texts(path, id_field="id", text_field="text"):
+    """
+    Yields (id, text, error) from a JSONL or CSV file. Rows without an id use their line/row number.
+    A record that cannot be scanned (invalid JSON, no text field) comes with text None and
+    an error message instead of stopping the scan.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = _json_rows(f)
+        for number, row in enumerate(rows, 1):
+            fallback_id = f"{os.path.basename(path)}:{number}"
+            if isinstance(row, ValueError):
+                yield fallback_id, None, str(row)
+                continue
+            if not isinstance(row, dict):
+                yield fallback_id, None, "Record is not a JSON object"
+                continue
+            item_id = row.get(id_field)
+            item_id = str(item_id if item_id not in (None, "") else fallback_id)
+            text = row.get(text_field)
+            if not isinstance(text, str):
+                yield item_id, None, f"Missing or non-text field {text_field!r}"
+                continue
+            yield item_id, text, None
+
+
+def iter_images(directory):
+    """
+    Yields image paths under directory (recursively, in a stable order); the relative path is the id.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def needs_retry(record):
+    """
+    True for a text result that failed for a reason worth retrying: an API error or open circuit
+    (check_safety returns is_harmful "unknown" instead of raising), an unparseable model response,
+    or a distress analysis that raised. Such results are written but not checkpointed.
+    """
+    safety = record.get("safety")
+    distress = record.get("distress")
+    if isinstance(safety, dict) and str(safety.get("is_harmful", "")).lower() == "unknown":
+        return True
+    return isinstance(distress, dict) and ("error" in distress or bool(distress.get("parse_error")))
+
+
+def load_checkpoint(out_path):
+    """
+    Ids already written to the output file, except results that need a retry (see needs_retry);
+    a later line for the same id supersedes them. A truncated last line (crash mid-write) is
+    ignored; ResultWriter starts the next record on a new line.
+    """
+    done = set()
+    if os.path.exists(out_path):
+        with open(out_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if not needs_retry(record):
+                        done.add(record["id"])
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class ResultWriter:
+    """
+    Appends one JSON line per result and flushes it, so a crash loses at most the line being written.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.count = 0
+        self.retries = 0
+        if self._file.tell() > 0 and not _ends_with_newline(path):
+            # The last record was cut short by a crash: keep it on its own (ignored) line
+            self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+            self.retries += needs_retry(record)
+
+    def close(self):
+        self._file.close()
+
+
+def analyze_text(item_id, text, with_distress=True):
+    from safety_checker import check_safety
+    from text_analyzer import analyze_text_for_distress
+
+    record = {"id": item_id, "type": "text", "safety": check_safety(text)}
+    if with_distress:
+        try:
+            record["distress"] = analyze_text_for_distress(text)
+        except Exception as e:
+            record["distress"] = {"error": str(e)}
+    return record
+
+
+def scan_texts(items, writer, done, concurrency=8, with_distress=True):
+    """
+    Runs texts through the analyzers with at most `concurrency` in flight. Only a bounded
+    window of items is read ahead, so huge inputs are never fully loaded.
+    """
+    pending = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item_id, text, error in items:
+            if item_id in done:
+                continue
+            if error is not None:
+                writer.write({"id": item_id, "type": "text", "error": error})
+                continue
+            if len(pending) >= concurrency * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    writer.write(future.result())
+            pending.add(pool.submit(analyze_text, item_id, text, with_distress))
+        for future in pending:
+            writer.write(future.result())
+
+
+def scan_images(paths, writer, done, root, batch_size=16):
+    from PIL import Image
+    from image_analyzer import analyze_images_batch
+
+    paths = (path for path in paths if os.path.relpath(path, root) not in done)
+    while True:
+        batch = list(islice(paths, batch_size))
+        if not batch:
+            break
+        images, ids = [], []
+        for path in batch:
+            item_id = os.path.relpath(path, root)
+            try:
+                with Image.open(path) as image:
+                    images.append(image.convert("RGB"))
+                ids.append(item_id)
+            except Exception as e:
+                writer.write({"id": item_id, "type": "image", "error": f"Could not read image: {e}"})
+        for item_id, result in zip(ids, analyze_images_batch(images, batch_size=batch_size)):
+            writer.write({"id": item_id, "type": "image", **result})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-scan text and image corpora for safety and distress.")
+    parser.add_argument("--texts", help="JSONL or CSV file of texts")
+    parser.add_argument("--images", help="Directory of images (scanned recursively)")
+    parser.add_argument("--out", required=True, help="JSONL output file, also used as the resume checkpoint")
+    parser.add_argument("--id-field", default="id", help="Id column/key in the text file (default: id)")
+    parser.add_argument("--text-field", default="text", help="Text column/key in the text file (default: text)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Texts analyzed in parallel (default: 8)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per model batch (default: 16)")
+    parser.add_argument("--no-distress", action="store_true", help="Only run check_safety on texts")
+    args = parser.parse_args(argv)
+
+    if not args.texts and not args.images:
+        parser.error("Give --texts and/or --images")
+
+    done = load_checkpoint(args.out)
+    if done:
+        print(f"Resuming: {len(done)} items already in {args.out}", file=sys.stderr)
+
+    writer = ResultWriter(args.out)
+    try:
+        if args.texts:
+            scan_texts(iter_texts(args.texts, args.id_field, args.text_field), writer, done,
+                       args.concurrency, not args.no_distress)
+        if args.images:
+            scan_images(iter_images(args.images), writer, done, args.images, args.batch_size)
+    finally:
+        writer.close()
+    print(f"Wrote {writer.count} results to {args.out}", file=sys.stderr)
+    if writer.retries:
+        print(f"{writer.retries} failed with API or parse errors; re-run the same command to retry them",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# cache.py
+# Content-addressed cache for model results (safety verdicts, distress analysis, rewrites).
+# Keys are a hash of the normalized text + model name + prompt version, so changing
+# either the model or the prompt naturally invalidates old entries.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+CACHE_PATH = os.environ.get("RESULT_CACHE_PATH", "data/cache.sqlite")
+CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 100_000))
+MEMORY_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MEMORY_ENTRIES", 10_000))
+
+
+def normalize_text(text):
+    """
+    Unicode-normalize and collapse whitespace, so trivially different copies share a key.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(namespace, text, model, prompt_version):
+    payload = json.dumps([namespace, model, prompt_version, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    In-process LRU tier with the same TTL as the disk tier. Values are stored as JSON strings
+    so callers never share (and accidentally mutate) the cached object.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES, ttl=CACHE_TTL, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (value, expires at)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if self.clock() >= expires:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        """
+        Store value until expires (a clock() time; default ttl from now), e.g. the expiry of
+        the disk entry it was promoted from.
+        """
+        with self._lock:
+            self._data[key] = (value, self.clock() + self.ttl if expires is None else expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent tier with TTL expiry and size-based (least recently used) eviction.
+    Reads never write: access times are collected in memory and written in one batch with
+    the next set(), or every ACCESS_FLUSH_EVERY hits, so recency (and LRU order) can lag
+    behind by that much.
+    """
+
+    ACCESS_FLUSH_EVERY = 1000
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._writes_since_evict = 0
+        self._pending_access = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key):
+        """
+        (value, expires at) for a live entry, or None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                # Deleted by the next eviction pass
+                return None
+            self._pending_access[key] = now
+            if len(self._pending_access) >= self.ACCESS_FLUSH_EVERY:
+                self._flush_access()
+                self._conn.commit()
+            return value, created + self.ttl
+
+    def _flush_access(self):
+        # Caller holds the lock
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE results SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._pending_access.pop(key, None)
+            self._flush_access()
+            self._writes_since_evict += 1
+            # Counting rows on every write is wasteful, check the size every 100 writes
+            if self._writes_since_evict >= 100:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._writes_since_evict = 0
+        expired = self._conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,)).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                (overflow,)
+            )
+        self.evictions += expired + max(overflow, 0)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Two-tier cache: memory first, then disk (disk hits are promoted to memory, keeping the
+    disk entry's expiry). Either tier can be None.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+    def get(self, key):
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                self.counters["memory_hits"] += 1
+                return json.loads(value)
+        if self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires = entry
+                self.counters["disk_hits"] += 1
+                if self.memory is not None:
+                    self.memory.set(key, value, expires)
+                return json.loads(value)
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        self.counters["sets"] += 1
+        if self.memory is not None:
+            self.memory.set(key, encoded)
+        if self.disk is not None:
+            self.disk.set(key, encoded)
+
+    def stats(self):
+        stats = dict(self.counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory) if self.memory is not None else 0
+        stats["disk_evictions"] = self.disk.evictions if self.disk is not None else 0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_disabled = os.environ.get("RESULT_CACHE", "on").lower() in ("0", "off", "false")
+
+
+def get_cache():
+    """
+    Process-wide cache, created on first use. Returns None when caching is disabled.
+    """
+    global _cache
+    if _disabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(MemoryCache(), SQLiteCache())
+    return _cache
+
+
+def set_cache(cache):
+    """
+    Replace the process-wide cache (e.g. memory-only in tests). Pass None to disable caching.
+    """
+    global _cache, _disabled
+    _cache = cache
+    _disabled = cache is None
+
+
+def cached_call(namespace, text, model, prompt_version, compute, cacheable=None):
+    """
+    Return the cached result for text, or call compute() and store its result
+    when cacheable(result) is true (errors should not be cached).
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+
+    key = cache_key(namespace, text, model, prompt_version)
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    value = compute()
+    if cacheable is None or cacheable(value):
+        cache.set(key, value)
+    return value
@@ -0,0 +1,84 @@
+# combined_analyzer.py
+# Safety check, distress analysis and (for harmful text) the safe rewrite in a single Gemini
+# request, instead of up to three sequential calls (check_safety, fix_text, analyze_text_for_distress).
+# The result carries the same shapes those functions return, so the UI can render either path.
+import cache
+import gemini_client
+import rate_limiter
+import response_parser
+import safety_checker
+from safety_checker import _api_error
+
+MODEL_NAME = safety_checker.MODEL_NAME
+# Bump when the prompt changes, so cached results from the old prompt are not reused
+PROMPT_VERSION = "1"
+
+
+def _build_prompt(text):
+    return f"""
+    You are a safety analysis tool and a psychological safety evaluator.
+    Respond ONLY with valid JSON, no explanation text outside the JSON.
+
+    Example format:
+    {{
+        "safety": {{
+            "is_harmful": "yes or no",
+            "category": "violence, hate, self-harm, etc",
+            "explanation": "short reason"
+        }},
+        "rewrite": "if is_harmful is yes: the text rewritten in a safe, calm and neutral way while keeping the meaning clear; otherwise null",
+        "distress": {{
+            "sentiment": "one of: positive, negative, neutral",
+            "risk_level": "one of: none, low, medium, high",
+            "explanation": "short description",
+            "recommended_actions": ["array of actions"]
+        }}
+    }}
+
+    Analyze this text: "{text}"
+    """
+
+
+def _split_result(raw):
+    """
+    Split the combined JSON into check_safety, fix_text and analyze_text_for_distress shaped parts.
+    """
+    safety, rewrite, distress = response_parser.parse_combined(raw)
+    distress = distress.to_dict()
+    if distress.get("parse_error"):
+        distress["raw_response"] = raw
+    return {"safety": safety.to_dict(), "safe_output": rewrite, "distress": distress}
+
+
+def _analyze_text_combined(text, api_client):
+    try:
+        response = rate_limiter.generate_content(
+            api_client, MODEL_NAME, _build_prompt(text),
+            config=gemini_client.json_config(response_parser.COMBINED_SCHEMA)
+        )
+    except Exception as e:
+        return {"safety": _api_error(e), "safe_output": None, "distress": {"error": str(e)}}
+    return _split_result(response.text)
+
+
+def _cacheable(result):
+    return result["safety"].get("is_harmful") != "unknown" and not result["distress"].get("parse_error")
+
+
+def analyze_text_combined(text, api_client=None):
+    """
+    One request for all three text analyses. Returns:
+      safety      - check_safety result (is_harmful, category, explanation, tier)
+      safe_output - fix_text result when the text is harmful, else None
+      distress    - analyze_text_for_distress result
+    Results for previously seen text come from the result cache.
+    """
+    called_api = []
+
+    def compute():
+        called_api.append(True)
+        return _analyze_text_combined(text, api_client or gemini_client.get_client())
+
+    result = cache.cached_call("combined", text, MODEL_NAME, PROMPT_VERSION, compute, cacheable=_cacheable)
+    result["safety"]["tier"] = "llm" if called_api else "cache"
+    return result
@@ -0,0 +1,3 @@
+# conftest.py
+# test_streamlit.py is a manual API check script and benchmarks/ holds runnable scripts, not tests
+collect_ignore = ["test_streamlit.py", "benchmarks"]
@@ -0,0 +1,129 @@
+# fake_client.py
+# Offline stand-in for genai.Client, so throughput can be measured without
+# network access or an API key. It only implements the calls this project uses.
+import asyncio
+import json
+import random
+import re
+import time
+
+from google.genai import errors
+
+
+SAFE_VERDICT = {
+    "is_harmful": "no",
+    "category": "none",
+    "explanation": "Fake response"
+}
+
+
+def default_responder(prompt):
+    # Packed prompts (see safety_checker.check_safety_packed) get one entry per item
+    item_ids = re.findall(r'<item id="(\d+)">', prompt)
+    if item_ids:
+        return json.dumps([{"id": int(item_id), **SAFE_VERDICT} for item_id in item_ids])
+    return json.dumps(SAFE_VERDICT)
+
+
+def api_error(code, retry_delay=None):
+    """
+    A genai APIError shaped like the real ones; retry_delay (seconds) adds the
+    google.rpc.RetryInfo detail Gemini sends with 429s.
+    """
+    body = {"error": {"code": code, "message": "Simulated failure", "status": "UNAVAILABLE" if code >= 500 else "RESOURCE_EXHAUSTED"}}
+    if retry_delay is not None:
+        body["error"]["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{retry_delay}s"}]
+    return (errors.ServerError if code >= 500 else errors.ClientError)(code, body)
+
+
+class FakeUsage:
+    def __init__(self, prompt, text):
+        # Rough approximation of Gemini tokenization (~4 characters per token)
+        self.prompt_token_count = max(1, len(prompt) // 4)
+        self.candidates_token_count = max(1, len(text) // 4)
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt, text)
+
+
+class _FakeModels:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def generate_content(self, model, contents, config=None):
+        self._fake.calls += 1
+        time.sleep(self._fake.next_latency())
+        self._fake.maybe_fail()
+        return FakeResponse(contents, self._fake.responder(contents))
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._fake.calls += 1
+        time.sleep(self._fake.next_latency())
+        self._fake.maybe_fail()
+        text = self._fake.responder(contents)
+        for i in range(0, len(text), self._fake.chunk_size):
+            if i:
+                time.sleep(self._fake.chunk_delay)
+            yield FakeResponse(contents, text[i:i + self._fake.chunk_size])
+
+
+class _FakeAsyncModels:
+    def __init__(self, fake):
+        self._fake = fake
+
+    async def generate_content(self, model, contents, config=None):
+        self._fake.calls += 1
+        await asyncio.sleep(self._fake.next_latency())
+        self._fake.maybe_fail()
+        return FakeResponse(contents, self._fake.responder(contents))
+
+
+class _FakeAio:
+    def __init__(self, fake):
+        self.models = _FakeAsyncModels(fake)
+
+
+class FakeClient:
+    """
+    Mimics client.models.generate_content(_stream) and client.aio.models.generate_content.
+    latency: seconds per call, or a function returning seconds (e.g. random sampling).
+    Streams yield chunk_size characters every chunk_delay seconds after the first chunk.
+    responder: function(prompt) -> response text.
+    failure_rate: share of calls that raise api_error(failure_code, retry_delay) instead of answering.
+    failures: function(call_number) -> exception to raise or None, for scripted outages
+    (overrides failure_rate).
+    """
+
+    def __init__(self, latency=0.2, responder=None, failure_rate=0.0, failure_code=503,
+                 retry_delay=None, failures=None, seed=0, chunk_size=20, chunk_delay=0.0):
+        self.latency = latency
+        self.responder = responder or default_responder
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.retry_delay = retry_delay
+        self.failures = failures
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.failed = 0
+        self._rng = random.Random(seed)
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+    def next_latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def maybe_fail(self):
+        if self.failures is not None:
+            error = self.failures(self.calls)
+        elif self.failure_rate and self._rng.random() < self.failure_rate:
+            error = api_error(self.failure_code, self.retry_delay)
+        else:
+            error = None
+        if error is not None:
+            self.failed += 1
+            raise error
@@ -1,36 +1,67 @@
 # fixer.py
-import os
-from dotenv import load_dotenv
-from google import genai  # Google AI Studio Python SDK
+from itertools import chain
 
-# Load API key from .env
-load_dotenv()
+import cache
+import gemini_client
+import rate_limiter
 
-# Create a client using your API key
-client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+MODEL_NAME = "gemini-2.0-flash"  # or "gemini-2.5-pro"
+# Bump when the prompt changes, so cached rewrites from the old prompt are not reused
+PROMPT_VERSION = "1"
 
-def fix_text(text):
+def fix_text(text, api_client=None):
     """
     Receives a potentially unsafe text and returns a safer, neutral version.
-    Uses Gemini model and returns plain text.
+    Uses Gemini model and returns plain text. Rewrites of previously seen text come from the result cache.
     """
-    prompt = f"""
-    The following text may be unsafe or harmful.
-    Rewrite it in a safe, calm and neutral way while keeping the meaning clear.
+    return "".join(fix_text_stream(text, api_client))
 
-    Text: {text}
+def fix_text_stream(text, api_client=None):
+    """
+    Streaming version of fix_text: yields the rewrite in chunks as the model generates them.
+    A cached rewrite is yielded as a single chunk. On an API error, yields "Error: ..." instead.
     """
+    result_cache = cache.get_cache()
+    key = cache.cache_key("rewrite", text, MODEL_NAME, PROMPT_VERSION)
+    cached = result_cache.get(key) if result_cache is not None else None
+    if isinstance(cached, str):
+        yield cached
+        return
 
+    prompt = _build_prompt(text)
+    chunks = []
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",  # or "gemini-2.5-pro"
-            contents=prompt
+        # Retries and rate limits apply until the first chunk arrives, before anything is yielded
+        first, stream = rate_limiter.call(
+            _open_stream, api_client or gemini_client.get_client(), prompt,
+            estimated_tokens=rate_limiter.estimate_tokens(prompt)
         )
-        return response.text
-
+        for chunk in chain([first] if first is not None else [], stream):
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
     except Exception as e:
-        return f"Error: {str(e)}"
+        # After a partial rewrite, keep the error on its own line
+        yield ("\n\n" if chunks else "") + f"Error: {str(e)}"
+        return
+
+    if result_cache is not None and chunks:
+        result_cache.set(key, "".join(chunks))
+
+def _build_prompt(text):
+    return f"""
+    The following text may be unsafe or harmful.
+    Rewrite it in a safe, calm and neutral way while keeping the meaning clear.
 
+    Text: {text}
+    """
+
+def _open_stream(api_client, prompt):
+    """
+    Start a streaming request and wait for its first chunk: (first chunk or None, rest of the stream).
+    """
+    stream = iter(api_client.models.generate_content_stream(model=MODEL_NAME, contents=prompt))
+    return next(stream, None), stream
 
 
 # import os
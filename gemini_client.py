@@ -0,0 +1,102 @@
+# gemini_client.py
+# One Gemini client for the whole process, shared by safety_checker, text_analyzer and fixer.
+# It is created on first use (importing the API modules does no credential or network work)
+# and its HTTP clients keep a pool of keep-alive connections sized for our concurrency, so
+# requests reuse TLS connections instead of opening new ones.
+#   GEMINI_MAX_CONNECTIONS   connections per pool (sync and async each), default 64
+#   GEMINI_KEEPALIVE_SECONDS how long idle connections are kept, default 60
+#   GEMINI_BASE_URL          send requests to another endpoint (e.g. a local fake model server)
+#   GEMINI_STRUCTURED_OUTPUT 1 (default) to ask for schema-constrained JSON, 0 for free-form text
+#   GEMINI_CASSETTE          cassette file for replay.py; with GEMINI_CASSETTE_MODE=record the
+#                            shared client records every call to it, with replay it serves them
+#                            (no network or API key needed)
+#   GEMINI_CASSETTE_LATENCY  replay delay: recorded (default), none, seconds or lognormal:<median>
+import os
+import threading
+
+import httpx
+from google import genai
+from google.genai import types
+
+MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", 64))
+KEEPALIVE_SECONDS = float(os.environ.get("GEMINI_KEEPALIVE_SECONDS", 60))
+STRUCTURED_OUTPUT = os.environ.get("GEMINI_STRUCTURED_OUTPUT", "1") == "1"
+BASE_URL = os.environ.get("GEMINI_BASE_URL")
+CASSETTE = os.environ.get("GEMINI_CASSETTE")
+CASSETTE_MODE = os.environ.get("GEMINI_CASSETTE_MODE", "replay")
+CASSETTE_LATENCY = os.environ.get("GEMINI_CASSETTE_LATENCY", "recorded")
+
+_client = None
+_lock = threading.Lock()
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_SECONDS
+    )
+
+
+def create_client(api_key=None, base_url=None):
+    """
+    A new genai.Client with pooled sync and async HTTP connections.
+    base_url (default GEMINI_BASE_URL) overrides the API endpoint.
+    """
+    if api_key is None:
+        # Optional: load environment variables from a .env file
+        from dotenv import load_dotenv
+        load_dotenv()
+        # Make sure you set your GOOGLE_API_KEY in environment variables
+        api_key = os.environ.get("GOOGLE_API_KEY")
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            base_url=base_url or BASE_URL,
+            client_args={"limits": _limits()},
+            async_client_args={"limits": _limits()}
+        )
+    )
+
+
+def _create_shared_client():
+    if not CASSETTE:
+        return create_client()
+    import replay
+    if CASSETTE_MODE == "record":
+        return replay.RecordingClient(create_client(), CASSETTE)
+    if CASSETTE_MODE == "replay":
+        return replay.ReplayClient(CASSETTE, latency=replay.parse_latency(CASSETTE_LATENCY))
+    raise ValueError(f"GEMINI_CASSETTE_MODE must be record or replay, not {CASSETTE_MODE!r}")
+
+
+def get_client():
+    """
+    The shared client, created on the first call (thread-safe).
+    A recording or replaying client (replay.py) when GEMINI_CASSETTE is set.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_shared_client()
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the shared client (e.g. with fake_client.FakeClient); None recreates it on next use.
+    """
+    global _client
+    with _lock:
+        _client = client
+
+
+def json_config(schema):
+    """
+    GenerateContentConfig asking for JSON matching schema (response_parser.*_SCHEMA),
+    or None when STRUCTURED_OUTPUT is off and the prompt alone describes the format.
+    """
+    if not STRUCTURED_OUTPUT:
+        return None
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=schema)
@@ -1,11 +1,29 @@
+import os
+from functools import partial
+from itertools import islice
+import numpy as np
 from PIL import Image
-import torch
-from transformers import AutoFeatureExtractor, AutoModelForImageClassification, CLIPProcessor, CLIPModel
+import telemetry
+from model_registry import registry
+
+# Models are loaded on first use through the registry, not at import time, and torch and
+# inference_backends are imported by the functions that run them, so importing this module
+# (and starting app.py) stays cheap.
+
+# Forward passes run on this backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+INFERENCE_BACKEND = os.environ.get("IMAGE_INFERENCE_BACKEND", "torch")
 
 # --- Emotion Detection Model ---
 model_name = "tahayf/vit-base-patch16-224_ferplus"
-extractor = AutoFeatureExtractor.from_pretrained(model_name)
-model = AutoModelForImageClassification.from_pretrained(model_name)
+
+def _load_emotion_model():
+    from transformers import AutoFeatureExtractor, AutoModelForImageClassification
+    extractor = AutoFeatureExtractor.from_pretrained(model_name)
+    model = AutoModelForImageClassification.from_pretrained(model_name)
+    model.eval()
+    return extractor, model
+
+registry.register("emotion", _load_emotion_model)
 
 # Map raw model labels to real emotion names
 labels_mapping = {
@@ -30,44 +48,297 @@ descriptions = {
     "contempt": "Feeling of disdain or disrespect."
 }
 
-def analyze_emotion(image: Image.Image):
-    inputs = extractor(images=image, return_tensors="pt")
-    outputs = model(**inputs)
-    probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
+def _emotion_logits(model, pixel_values):
+    return model(pixel_values=pixel_values).logits
+
+def _load_emotion_runner(backend):
+    import torch
+    import inference_backends
+    _, model = registry.get("emotion")
+    vit, _ = registry.get("image_preprocess")
+    return inference_backends.make_runner(
+        backend, model, _emotion_logits, f"emotion-{model_name}", torch.zeros(1, 3, *vit.size)
+    )
+
+def _emotion_probs(pixel_values, backend=None):
+    import torch
+    runner = registry.get(f"emotion_runner:{backend or INFERENCE_BACKEND}")
+    with torch.inference_mode():
+        return torch.nn.functional.softmax(runner(pixel_values), dim=-1)
+
+def _emotion_result(probs):
+    """
+    (result, top_label, top_prob, explanation) from one image's probability row.
+    """
+    _, model = registry.get("emotion")
     raw_labels = model.config.id2label
-    result = {labels_mapping.get(raw_labels[i], raw_labels[i]): float(probs[0][i]) for i in range(len(raw_labels))}
+    result = {labels_mapping.get(raw_labels[i], raw_labels[i]): float(probs[i]) for i in range(len(raw_labels))}
 
     top_label, top_prob = max(result.items(), key=lambda x: x[1])
     explanation = descriptions.get(top_label, "Emotion not recognized.")
     return result, top_label, top_prob, explanation
 
+def analyze_emotion(image: Image.Image, backend=None):
+    extractor, _ = registry.get("emotion")
+    inputs = extractor(images=image, return_tensors="pt")
+    probs = _emotion_probs(inputs["pixel_values"], backend)
+    return _emotion_result(probs[0])
+
 # --- Safety / Content Risk Detection (CLIP zero-shot) ---
 clip_model_name = "openai/clip-vit-base-patch32"
-clip_model = CLIPModel.from_pretrained(clip_model_name)
-clip_processor = CLIPProcessor.from_pretrained(clip_model_name)
 risk_labels = ["safe", "violent", "sexual", "graphic", "neutral"]
+# Prompt templates for each label; "{}" alone scores the bare label, as the full CLIP pass does
+risk_prompt_templates = ["{}"]
+# Optional prompt ensemble, see set_risk_labels
+RISK_PROMPT_ENSEMBLE = ["a photo of {} content", "an image showing {} content", "{} imagery"]
+# (labels, templates) in use. set_risk_labels replaces it in one assignment, and the encoded
+# label embeddings carry the pair they were computed from (see _risk_text), so a scoring call
+# never pairs one label list with another list's embeddings
+_risk_config = (tuple(risk_labels), tuple(risk_prompt_templates))
+# Score images against precomputed label embeddings (vision encoder + matrix multiply only)
+# instead of running the CLIP text tower on the labels for every image
+PRECOMPUTED_TEXT_EMBEDDINGS = True
+
+risk_explanations = {
+    "safe": "The image appears safe for general viewing.",
+    "violent": "The image may contain violent content.",
+    "sexual": "The image may contain sexual content.",
+    "graphic": "The image may contain graphic or disturbing content.",
+    "neutral": "No significant risk detected."
+}
+
+def _load_clip_model():
+    from transformers import CLIPProcessor, CLIPModel
+    clip_processor = CLIPProcessor.from_pretrained(clip_model_name)
+    clip_model = CLIPModel.from_pretrained(clip_model_name)
+    clip_model.eval()
+    return clip_processor, clip_model
+
+def _encode_risk_labels():
+    """
+    (labels, templates, normalized text embedding per label averaged over its prompt templates).
+    """
+    import torch
+    labels, templates = _risk_config
+    clip_processor, clip_model = registry.get("clip")
+    prompts = [template.format(label) for label in labels for template in templates]
+    with torch.inference_mode():
+        inputs = clip_processor(text=prompts, return_tensors="pt", padding=True)
+        features = clip_model.get_text_features(**inputs)
+    features = features / features.norm(dim=-1, keepdim=True)
+    features = features.view(len(labels), len(templates), -1).mean(dim=1)
+    return labels, templates, features / features.norm(dim=-1, keepdim=True)
+
+registry.register("clip", _load_clip_model)
+registry.register("clip_risk_text", _encode_risk_labels)
+
+def set_risk_labels(labels, templates=None, explanations=None):
+    """
+    Replace the risk labels (and optionally their prompt templates, e.g. RISK_PROMPT_ENSEMBLE).
+    Label embeddings are recomputed once, on the next analyzed image.
+    """
+    global risk_labels, risk_prompt_templates, _risk_config
+    labels, templates = tuple(labels), tuple(templates or ["{}"])
+    if explanations:
+        risk_explanations.update(explanations)
+    risk_labels, risk_prompt_templates = list(labels), list(templates)
+    _risk_config = (labels, templates)
+    registry.unload("clip_risk_text")
+
+def _risk_text():
+    """
+    (labels, templates, text features) for the current risk labels, read once per scoring call.
+    Embeddings encoded from labels that have since been replaced are encoded again.
+    """
+    state = registry.get("clip_risk_text")
+    if state[:2] != _risk_config:
+        registry.unload("clip_risk_text")
+        state = registry.get("clip_risk_text")
+    return state
+
+def _risk_explanation(label):
+    return risk_explanations.get(label, f"The image may contain {label} content.")
+
+def analyze_risk(image: Image.Image, precomputed=None, backend=None):
+    import torch
+    clip_processor, clip_model = registry.get("clip")
+    if precomputed is None:
+        precomputed = PRECOMPUTED_TEXT_EMBEDDINGS
+
+    if precomputed:
+        labels, _, text_features = _risk_text()
+        inputs = clip_processor(images=image, return_tensors="pt")
+        probs = _risk_probs(inputs["pixel_values"], text_features, backend)
+    else:
+        # The full CLIP pass (text and vision towers) always runs on the fp32 PyTorch model
+        labels, templates = _risk_config
+        prompts = [template.format(label) for label in labels for template in templates]
+        with torch.inference_mode():
+            inputs = clip_processor(text=prompts, images=image, return_tensors="pt", padding=True)
+            outputs = clip_model(**inputs)
+            # Average template logits per label
+            logits = outputs.logits_per_image.view(1, len(labels), len(templates)).mean(dim=-1)
+            probs = torch.nn.functional.softmax(logits, dim=1)
+
+    return _risk_result(probs[0], labels)
+
+def _clip_image_features(clip_model, pixel_values):
+    return clip_model.get_image_features(pixel_values=pixel_values)
+
+def _load_clip_image_runner(backend):
+    import torch
+    import inference_backends
+    _, clip_model = registry.get("clip")
+    _, clip = registry.get("image_preprocess")
+    return inference_backends.make_runner(
+        backend, clip_model, _clip_image_features, f"clip-image-{clip_model_name}", torch.zeros(1, 3, *clip.crop)
+    )
 
-def analyze_risk(image: Image.Image):
-    inputs = clip_processor(text=risk_labels, images=image, return_tensors="pt", padding=True)
-    outputs = clip_model(**inputs)
-    probs = torch.nn.functional.softmax(outputs.logits_per_image, dim=1)
-    result = {label: float(prob) for label, prob in zip(risk_labels, probs[0])}
+def _risk_probs(pixel_values, text_features, backend=None):
+    """
+    Risk label probabilities for a batch of CLIP pixel values, against precomputed label
+    embeddings (from _risk_text).
+    """
+    import torch
+    _, clip_model = registry.get("clip")
+    runner = registry.get(f"clip_image_runner:{backend or INFERENCE_BACKEND}")
+    with torch.inference_mode():
+        image_features = runner(pixel_values)
+        image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        logits = clip_model.logit_scale.exp() * image_features @ text_features.T
+        return torch.nn.functional.softmax(logits, dim=1)
+
+def _risk_result(probs, labels):
+    """
+    (result, top_label, top_prob, explanation) from one image's probability row over labels.
+    """
+    result = {label: float(prob) for label, prob in zip(labels, probs)}
 
     top_label, top_prob = max(result.items(), key=lambda x: x[1])
-    explanations = {
-        "safe": "The image appears safe for general viewing.",
-        "violent": "The image may contain violent content.",
-        "sexual": "The image may contain sexual content.",
-        "graphic": "The image may contain graphic or disturbing content.",
-        "neutral": "No significant risk detected."
-    }
-    explanation = explanations.get(top_label, "Risk not recognized.")
+    explanation = _risk_explanation(top_label)
     return result, top_label, top_prob, explanation
 
+# --- Shared preprocessing ---
+# Both models take 224x224 inputs but resize differently: the ViT extractor squashes the whole
+# image to 224x224, CLIP resizes the shortest edge to 224 and center-crops. preprocess_images
+# decodes and converts each image once, resizes once per distinct geometry (a single resize
+# serves both models when they coincide, e.g. square images with the same filter, or always
+# with shared_resize=True), and normalizes the whole batch with one fused multiply-add per model.
+
+def _resample(value):
+    return Image.Resampling(int(value))
+
+def _size_hw(size):
+    if isinstance(size, dict):
+        return size["height"], size["width"]
+    return size, size
+
+class _ModelInputSpec:
+    def __init__(self, resample, rescale_factor, mean, std, size=None, shortest_edge=None, crop=None):
+        self.resample = _resample(resample)
+        self.size = size
+        self.shortest_edge = shortest_edge
+        self.crop = crop
+        # (x * rescale - mean) / std == x * scale + offset, computed once
+        std = np.asarray(std, dtype=np.float32)
+        self.scale = (rescale_factor / std).astype(np.float32)
+        self.offset = (-np.asarray(mean, dtype=np.float32) / std).astype(np.float32)
+
+    def to_tensor(self, pixels):
+        # pixels: uint8 [N, H, W, 3] -> normalized float32 [N, 3, H, W]
+        import torch
+        values = pixels.astype(np.float32)
+        values *= self.scale
+        values += self.offset
+        return torch.from_numpy(values.transpose(0, 3, 1, 2).copy())
+
+def _load_preprocess_specs():
+    extractor, _ = registry.get("emotion")
+    clip_processor, _ = registry.get("clip")
+    clip_image_processor = clip_processor.image_processor
+
+    vit = _ModelInputSpec(extractor.resample, extractor.rescale_factor, extractor.image_mean, extractor.image_std,
+                          size=_size_hw(extractor.size))
+    clip = _ModelInputSpec(clip_image_processor.resample, clip_image_processor.rescale_factor,
+                           clip_image_processor.image_mean, clip_image_processor.image_std,
+                           shortest_edge=clip_image_processor.size["shortest_edge"],
+                           crop=_size_hw(clip_image_processor.crop_size))
+    return vit, clip
+
+registry.register("image_preprocess", _load_preprocess_specs)
+
+# One runner per backend (inference_backends.BACKENDS, not imported here to keep torch out of
+# the import), each built on first use (int8 quantization / ONNX export happen then)
+for _backend in ("torch", "int8", "onnx"):
+    registry.register(f"emotion_runner:{_backend}", partial(_load_emotion_runner, _backend))
+    registry.register(f"clip_image_runner:{_backend}", partial(_load_clip_image_runner, _backend))
+
+def _clip_geometry(width, height, clip):
+    """
+    Resized (width, height) and crop box, matching CLIPImageProcessor's shortest-edge resize + center crop.
+    """
+    if width <= height:
+        new_width, new_height = clip.shortest_edge, int(clip.shortest_edge * height / width)
+    else:
+        new_width, new_height = int(clip.shortest_edge * width / height), clip.shortest_edge
+    crop_height, crop_width = clip.crop
+    top = (new_height - crop_height) // 2
+    left = (new_width - crop_width) // 2
+    return (new_width, new_height), (left, top, left + crop_width, top + crop_height)
+
+def preprocess_images(images, shared_resize=False):
+    """
+    Returns (vit_pixel_values, clip_pixel_values) for a list of PIL images.
+    shared_resize=True feeds the CLIP crop to the ViT model as well (one resize per image,
+    at the cost of center-cropping instead of squashing the face model's input).
+    """
+    vit, clip = registry.get("image_preprocess")
+    vit_height, vit_width = vit.size
+    vit_pixels = np.empty((len(images), vit_height, vit_width, 3), dtype=np.uint8)
+    clip_pixels = np.empty((len(images), clip.crop[0], clip.crop[1], 3), dtype=np.uint8)
+
+    for i, image in enumerate(images):
+        # Decode and convert once, both models read from this buffer
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        clip_size, crop_box = _clip_geometry(image.width, image.height, clip)
+        clip_image = image.resize(clip_size, resample=clip.resample).crop(crop_box)
+        clip_pixels[i] = np.asarray(clip_image)
+
+        reuse = shared_resize or (
+            clip_size == (vit_width, vit_height) and crop_box == (0, 0, vit_width, vit_height)
+            and clip.resample == vit.resample
+        )
+        if reuse and clip_image.size == (vit_width, vit_height):
+            vit_pixels[i] = clip_pixels[i]
+        else:
+            vit_pixels[i] = np.asarray(image.resize((vit_width, vit_height), resample=vit.resample))
+
+    return vit.to_tensor(vit_pixels), clip.to_tensor(clip_pixels)
+
+# --- Model lifecycle ---
+def warmup_models():
+    """
+    Load both models (on the configured backend) now instead of on the first uploaded image.
+    """
+    registry.warmup([
+        "emotion", "clip", "clip_risk_text", "image_preprocess",
+        f"emotion_runner:{INFERENCE_BACKEND}", f"clip_image_runner:{INFERENCE_BACKEND}"
+    ])
+
+def unload_models():
+    registry.unload()
+
+def model_stats():
+    """
+    Load time and memory per model, see ModelRegistry.stats.
+    """
+    return registry.stats()
+
 # --- Combined Analysis ---
-def analyze_image_combined(image: Image.Image):
-    emotion_result, emotion_label, emotion_prob, emotion_desc = analyze_emotion(image)
-    risk_result, risk_label, risk_prob, risk_desc = analyze_risk(image)
+def _combined_result(emotion, risk):
+    emotion_result, emotion_label, emotion_prob, emotion_desc = emotion
+    risk_result, risk_label, risk_prob, risk_desc = risk
 
     return {
         "emotion": {
@@ -84,6 +355,34 @@ def analyze_image_combined(image: Image.Image):
         }
     }
 
+def analyze_image_combined(image: Image.Image):
+    return analyze_images_batch([image])[0]
+
+def analyze_images_batch(images, batch_size=16, backend=None):
+    """
+    Analyze many images, running shared preprocessing and both models on stacked batches
+    of batch_size under inference mode. images can be any iterable of PIL images,
+    it is consumed one batch at a time. backend overrides INFERENCE_BACKEND.
+    Returns one analyze_image_combined-shaped dict per image, in order.
+    """
+    results = []
+    images = iter(images)
+    while True:
+        batch = list(islice(images, batch_size))
+        if not batch:
+            break
+        with telemetry.span("image.preprocess", images=len(batch)):
+            vit_pixel_values, clip_pixel_values = preprocess_images(batch)
+        with telemetry.span("image.emotion_forward", images=len(batch), backend=backend or INFERENCE_BACKEND):
+            emotion_probs = _emotion_probs(vit_pixel_values, backend)
+        with telemetry.span("image.risk_forward", images=len(batch), backend=backend or INFERENCE_BACKEND):
+            labels, _, text_features = _risk_text()
+            risk_probs = _risk_probs(clip_pixel_values, text_features, backend)
+        telemetry.count("images_analyzed_total", len(batch))
+        for i in range(len(batch)):
+            results.append(_combined_result(_emotion_result(emotion_probs[i]), _risk_result(risk_probs[i], labels)))
+    return results
+
 # from openai import OpenAI
 #
 # client = OpenAI(api_key="OPENAI_API_KEY")
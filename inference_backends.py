@@ -0,0 +1,87 @@
+# inference_backends.py
+# CPU inference backends for the image models. Each backend turns a PyTorch model plus a
+# forward function into a runner(pixel_values) -> torch.Tensor, so image_analyzer can swap
+# backends without changing analyze_emotion / analyze_risk.
+#   torch - the fp32 PyTorch model as loaded
+#   int8  - PyTorch dynamic int8 quantization of the Linear layers
+#   onnx  - the forward function exported to ONNX and run with ONNX Runtime
+#           (needs `pip install onnx onnxruntime`, exported once to ONNX_DIR)
+# torch is imported by the functions that use it, so importing this module stays cheap.
+import copy
+import os
+import re
+
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_DIR = os.environ.get("ONNX_MODEL_DIR", "models/onnx")
+ONNX_OPSET = 17
+
+
+def _forward_module(model, forward):
+    """
+    Wraps model + forward function into a module with a single pixel_values input, for ONNX export.
+    """
+    import torch
+
+    class ForwardModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return forward(self.model, pixel_values)
+
+    return ForwardModule()
+
+
+def onnx_path(name):
+    return os.path.join(ONNX_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".onnx")
+
+
+def export_onnx(model, forward, name, example_input):
+    """
+    Export forward(model, pixel_values) to ONNX with a dynamic batch dimension.
+    """
+    import torch
+    path = onnx_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with torch.inference_mode():
+        torch.onnx.export(
+            _forward_module(model, forward).eval(),
+            (example_input,),
+            path,
+            input_names=["pixel_values"],
+            output_names=["output"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=ONNX_OPSET
+        )
+    return path
+
+
+def make_runner(backend, model, forward, name, example_input):
+    """
+    runner(pixel_values) -> torch.Tensor computing forward(model, pixel_values) on the given backend.
+    name identifies the exported ONNX file; example_input is only used for the export.
+    """
+    import torch
+    if backend == "torch":
+        return lambda pixel_values: forward(model, pixel_values)
+
+    if backend == "int8":
+        # Quantize a copy, the fp32 model stays available as the reference
+        quantized = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear}, dtype=torch.qint8)
+        return lambda pixel_values: forward(quantized, pixel_values)
+
+    if backend == "onnx":
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime: pip install onnx onnxruntime") from e
+
+        path = onnx_path(name)
+        if not os.path.exists(path):
+            export_onnx(model, forward, name, example_input)
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        return lambda pixel_values: torch.from_numpy(session.run(None, {input_name: pixel_values.numpy()})[0])
+
+    raise ValueError(f"Unknown inference backend {backend!r}, expected one of {BACKENDS}")
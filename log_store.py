@@ -0,0 +1,158 @@
+# log_store.py
+# Columnar store for the safety event log. compact_logs() converts rotated CSV logs
+# (see logger.py) into Parquet files partitioned by date (data/logs_parquet/date=YYYY-MM-DD/),
+# and the query functions below read only the columns and date partitions they need.
+#
+#   python log_store.py compact
+#   python log_store.py report [start] [end]
+import glob
+import os
+import sys
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+
+import logger
+
+PARQUET_DIR = os.environ.get("LOG_PARQUET_DIR", "data/logs_parquet")
+
+COLUMN_TYPES = {
+    "timestamp": pa.timestamp("us"),
+    "input_text": pa.string(),
+    "is_harmful": pa.string(),
+    "category": pa.string(),
+    "explanation": pa.string()
+}
+_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+_WINDOW_UNITS = {"s": "second", "m": "minute", "h": "hour", "d": "day"}
+
+
+def _rotated_logs():
+    base, ext = os.path.splitext(logger.event_log.path)
+    return sorted(glob.glob(f"{base}.*{ext}"))
+
+
+def compact_logs(include_active=True):
+    """
+    Convert rotated CSV logs into date-partitioned Parquet, deleting each CSV once written.
+    With include_active, the active log is rotated first so every event so far is compacted.
+    Re-running after a crash is safe: a file is rewritten under the same name before its CSV is deleted.
+    Returns the number of events compacted.
+    """
+    if include_active:
+        logger.flush()
+        logger.event_log.rotate()
+
+    compacted = 0
+    for path in _rotated_logs():
+        # input_text comes from a text area, so quoted values often contain newlines
+        table = pv.read_csv(
+            path,
+            parse_options=pv.ParseOptions(newlines_in_values=True),
+            convert_options=pv.ConvertOptions(column_types=COLUMN_TYPES, strings_can_be_null=True)
+        )
+        if table.num_rows:
+            table = table.append_column("date", pc.strftime(table["timestamp"], format="%Y-%m-%d"))
+            ds.write_dataset(
+                table, PARQUET_DIR, format="parquet", partitioning=_PARTITIONING,
+                basename_template=os.path.splitext(os.path.basename(path))[0] + "-{i}.parquet",
+                existing_data_behavior="overwrite_or_ignore"
+            )
+        compacted += table.num_rows
+        os.remove(path)
+    return compacted
+
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _read(columns, start=None, end=None, extra_filter=None):
+    """
+    Read only the given columns, pruning date partitions outside [start, end).
+    """
+    if not os.path.isdir(PARQUET_DIR):
+        return pa.table({name: pa.array([], type=COLUMN_TYPES[name]) for name in columns})
+
+    start, end = _to_datetime(start), _to_datetime(end)
+    condition = None
+    if start is not None:
+        # The partition predicate prunes whole directories, the timestamp predicate trims the edges
+        condition = (ds.field("date") >= start.strftime("%Y-%m-%d")) & \
+                    (ds.field("timestamp") >= pa.scalar(start, type=COLUMN_TYPES["timestamp"]))
+    if end is not None:
+        end_condition = (ds.field("date") <= end.strftime("%Y-%m-%d")) & \
+                        (ds.field("timestamp") < pa.scalar(end, type=COLUMN_TYPES["timestamp"]))
+        condition = end_condition if condition is None else condition & end_condition
+    if extra_filter is not None:
+        condition = extra_filter if condition is None else condition & extra_filter
+
+    dataset = ds.dataset(PARQUET_DIR, format="parquet", partitioning=_PARTITIONING)
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def counts_by_category(start=None, end=None):
+    """
+    {category: number of events} between start and end (datetimes or ISO strings).
+    """
+    table = _read(["category", "timestamp"], start, end)
+    counts = table.group_by("category").aggregate([("timestamp", "count")])
+    return dict(zip(counts["category"].to_pylist(), counts["timestamp_count"].to_pylist()))
+
+
+def _parse_window(window):
+    unit = _WINDOW_UNITS.get(window[-1:])
+    if unit is None or not window[:-1].isdigit():
+        raise ValueError(f"Invalid window {window!r}, expected e.g. 15m, 1h or 1d")
+    return int(window[:-1]), unit
+
+
+def harmful_ratio(window="1h", start=None, end=None):
+    """
+    Harmful rate per time window: [{"window_start", "events", "harmful", "ratio"}], oldest first.
+    """
+    multiple, unit = _parse_window(window)
+    table = _read(["timestamp", "is_harmful"], start, end)
+    harmful = pc.fill_null(pc.equal(pc.utf8_lower(table["is_harmful"]), "yes"), False)
+    table = pa.table({
+        "window_start": pc.floor_temporal(table["timestamp"], multiple=multiple, unit=unit),
+        "harmful": pc.cast(harmful, pa.int64())
+    })
+
+    grouped = table.group_by("window_start").aggregate([("harmful", "sum"), ("harmful", "count")])
+    grouped = grouped.sort_by("window_start")
+    return [
+        {"window_start": window_start, "events": events, "harmful": harmful_count, "ratio": harmful_count / events}
+        for window_start, harmful_count, events in zip(
+            grouped["window_start"].to_pylist(), grouped["harmful_sum"].to_pylist(), grouped["harmful_count"].to_pylist()
+        )
+    ]
+
+
+def top_explanations(n=10, start=None, end=None, harmful_only=True):
+    """
+    The n most frequent explanations, as [(explanation, count)].
+    """
+    extra_filter = pc.utf8_lower(ds.field("is_harmful")) == "yes" if harmful_only else None
+    table = _read(["explanation"], start, end, extra_filter)
+    counts = table.group_by("explanation").aggregate([("explanation", "count")])
+    counts = counts.sort_by([("explanation_count", "descending")]).slice(0, n)
+    return list(zip(counts["explanation"].to_pylist(), counts["explanation_count"].to_pylist()))
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "compact":
+        print(f"Compacted {compact_logs()} events into {PARQUET_DIR}")
+    elif command == "report":
+        start = sys.argv[2] if len(sys.argv) > 2 else None
+        end = sys.argv[3] if len(sys.argv) > 3 else None
+        print("Events by category:", counts_by_category(start, end))
+        for row in harmful_ratio("1h", start, end):
+            print(f"{row['window_start']}  {row['harmful']}/{row['events']} harmful ({row['ratio']:.1%})")
+        print("Top explanations:", top_explanations(10, start, end))
+    else:
+        sys.exit("Usage: python log_store.py [compact | report [start] [end]]")
@@ -1,12 +1,333 @@
-import pandas as pd
-from datetime import datetime
+import atexit
+import csv
+import io
+import json
+import queue
+from contextlib import contextmanager
 import os
+import threading
+import time
+from datetime import datetime
+
+import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
 
 LOG_PATH = "data/logs.csv"
+FIELDS = ["timestamp", "input_text", "is_harmful", "category", "explanation"]
 
-def log_event(input_text, safety_result):
-    os.makedirs("data", exist_ok=True)
+# Buffered rows are written when FLUSH_EVERY rows are pending or FLUSH_INTERVAL seconds have passed
+FLUSH_EVERY = int(os.environ.get("LOG_FLUSH_EVERY", 100))
+FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", 1.0))
+# The active file is renamed to logs.<timestamp>.csv once it reaches this size or age
+ROTATE_BYTES = int(os.environ.get("LOG_ROTATE_BYTES", 100 * 1024 * 1024))
+ROTATE_SECONDS = float(os.environ.get("LOG_ROTATE_SECONDS", 24 * 3600))
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    Exclusive advisory lock on <path>.lock, shared by every process writing the log.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _encode_row(entry):
+    out = io.StringIO()
+    csv.writer(out).writerow([entry.get(field) for field in FIELDS])
+    return out.getvalue()
+
+
+class EventLog:
+    """
+    Append-only CSV event log. Rows are buffered in memory and appended in one write,
+    so the cost per event stays constant however large the file gets. Appends and
+    rotation happen under an exclusive lock on <path>.lock, so several processes
+    (e.g. Streamlit workers) can share the same log.
+    """
+
+    def __init__(self, path=LOG_PATH, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL,
+                 rotate_bytes=ROTATE_BYTES, rotate_seconds=ROTATE_SECONDS):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def write(self, entry):
+        self.write_many([entry])
+
+    def write_many(self, entries):
+        rows = [_encode_row(entry) for entry in entries]
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+
+        with telemetry.span("log.flush", rows=len(self._buffer)), _file_lock(self.path):
+            self._rotate_if_needed()
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                if f.tell() == 0:
+                    f.write(_encode_row({field: field for field in FIELDS}))
+                f.write(data)
+        self._buffer.clear()
+
+    def _file_started_at(self):
+        """
+        Timestamp of the first row in the active file, or None.
+        """
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            first = next(reader, None)
+        try:
+            return datetime.fromisoformat(first[0]) if first else None
+        except ValueError:
+            return None
+
+    def _rotate_if_needed(self, force=False):
+        # Caller holds the file lock
+        if not os.path.exists(self.path):
+            return
+        if not force and os.path.getsize(self.path) < self.rotate_bytes:
+            started_at = self._file_started_at()
+            if started_at is None or (datetime.utcnow() - started_at).total_seconds() < self.rotate_seconds:
+                return
+
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        rotated = f"{base}.{stamp}{ext}"
+        suffix = 1
+        while os.path.exists(rotated):
+            rotated = f"{base}.{stamp}-{suffix}{ext}"
+            suffix += 1
+        os.rename(self.path, rotated)
+
+    def rotate(self):
+        """
+        Flush, then rotate the active file regardless of its size or age.
+        """
+        with self._lock:
+            self._flush_locked()
+            with _file_lock(self.path):
+                self._rotate_if_needed(force=True)
+
+
+class AsyncLogWriter:
+    """
+    Keeps disk I/O off the request path: log_event only enqueues into a bounded in-memory
+    queue, and a background thread drains it in batches into the EventLog.
+    When the queue is full, policy decides what happens:
+      block       - the caller waits for room (no event is lost)
+      drop_oldest - the oldest queued event is discarded to make room
+      spill       - the event is appended to a JSON Lines spill file, written to the log later
+    """
+
+    POLICIES = ("block", "drop_oldest", "spill")
+    # How often the writer thread checks for shutdown while the queue is empty
+    POLL_SECONDS = 0.05
 
+    def __init__(self, event_log, max_queue=None, policy=None, spill_path=None, batch_size=None):
+        max_queue = max_queue or int(os.environ.get("LOG_QUEUE_SIZE", 10_000))
+        policy = policy or os.environ.get("LOG_BACKPRESSURE", "block")
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of {self.POLICIES}")
+        self.event_log = event_log
+        self.policy = policy
+        self.spill_path = spill_path or os.path.splitext(event_log.path)[0] + ".spill.jsonl"
+        self.batch_size = batch_size or event_log.flush_every
+        self.counters = {"enqueued": 0, "written": 0, "dropped": 0, "spilled": 0, "batches": 0, "errors": 0}
+        self._queue = queue.Queue(max_queue)
+        self._stop = threading.Event()
+        self._counters_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def _count(self, name, amount=1):
+        # Called from producer threads and the writer thread
+        with self._counters_lock:
+            self.counters[name] += amount
+
+    def submit(self, entry):
+        self._ensure_started()
+        if self.policy == "block":
+            self._queue.put(entry)
+        elif self.policy == "drop_oldest":
+            while True:
+                try:
+                    self._queue.put_nowait(entry)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        self._count("dropped")
+                    except queue.Empty:
+                        pass
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self._spill(entry)
+                return
+        self._count("enqueued")
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name="async-log-writer", daemon=True)
+                    self._thread.start()
+
+    def _spill(self, entry):
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._count("spilled")
+
+    def _ingest_spill(self):
+        """
+        Move spilled events into the log (called when the queue has drained).
+        """
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return
+            with open(self.spill_path, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spill_path)
+        if entries:
+            self._write(entries)
+
+    def _write(self, entries):
+        try:
+            with telemetry.span("log.write", rows=len(entries)):
+                self.event_log.write_many(entries)
+            self._count("written", len(entries))
+            self._count("batches")
+        except Exception:
+            # Disk errors must not kill the writer thread; the batch is counted as dropped
+            self._count("errors")
+            self._count("dropped", len(entries))
+
+    def _drain_batch(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write(batch)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self):
+        # Stopping is signalled through self._stop rather than a sentinel in the queue, so it
+        # can neither block on a full queue nor be evicted by drop_oldest. The short poll keeps
+        # shutdown() prompt; idle work still happens once per flush_interval.
+        idle_since = time.monotonic()
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.POLL_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+                if time.monotonic() - idle_since >= self.event_log.flush_interval:
+                    # Idle: bring back spilled events and push buffered rows to disk
+                    self._ingest_spill()
+                    self.event_log.flush()
+                    idle_since = time.monotonic()
+                continue
+            self._drain_batch(entry)
+            idle_since = time.monotonic()
+
+        self._ingest_spill()
+        self.event_log.flush()
+
+    def flush(self):
+        """
+        Block until everything queued so far (and any spill file) is written to disk.
+        """
+        if self._thread is not None:
+            self._queue.join()
+        self._ingest_spill()
+        self.event_log.flush()
+
+    def shutdown(self, timeout=10):
+        """
+        Drain the queue, flush to disk and stop the writer thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join(timeout)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = None
+            # Events submitted after the writer thread stopped
+            while True:
+                try:
+                    self._drain_batch(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        self._ingest_spill()
+        self.event_log.flush()
+
+    def metrics(self):
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {"queue_depth": self._queue.qsize(), "policy": self.policy, **counters}
+
+event_log = EventLog()
+writer = AsyncLogWriter(event_log)
+
+
+def flush():
+    """
+    Write every event logged so far to disk.
+    """
+    writer.flush()
+
+
+def metrics():
+    """
+    Queue depth and counters (enqueued, written, dropped, spilled, batches, errors) of the background writer.
+    """
+    return writer.metrics()
+
+
+atexit.register(writer.shutdown)
+
+
+def log_event(input_text, safety_result):
     entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "input_text": input_text,
@@ -14,11 +335,5 @@ def log_event(input_text, safety_result):
         "category": safety_result.get("category"),
         "explanation": safety_result.get("explanation")
     }
-
-    if os.path.exists(LOG_PATH):
-        df = pd.read_csv(LOG_PATH)
-        df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-    else:
-        df = pd.DataFrame([entry])
-
-    df.to_csv(LOG_PATH, index=False)
+    telemetry.count("log_events_total")
+    writer.submit(entry)
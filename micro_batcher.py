@@ -0,0 +1,91 @@
+# micro_batcher.py
+# Groups concurrent requests into model batches for server.py. Only one batch runs at a time:
+# while it runs, new items keep collecting, and they go out as the next batch as soon as the
+# worker is free. Under load, batches therefore grow to match the model's speed instead of
+# being cut every few milliseconds and queueing up behind each other.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submit() calls into batches for batch_fn(items) -> results.
+    When the worker is free, a batch is dispatched once max_batch_size items are waiting or
+    the oldest has waited max_wait_ms, whichever comes first; while a batch runs, items wait
+    for it to finish. Batches run on a dedicated thread, so the event loop stays free and
+    the models are never called concurrently.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.counters = {"items": 0, "batches": 0, "max_batch": 0}
+        # (item, future, arrival time) in arrival order
+        self._pending = []
+        self._timer = None
+        self._running = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        self._maybe_dispatch()
+        return await future
+
+    def _maybe_dispatch(self):
+        if self._running or not self._pending:
+            return
+        loop = asyncio.get_running_loop()
+        waited = loop.time() - self._pending[0][2]
+        if len(self._pending) < self.max_batch_size and waited < self.max_wait:
+            if self._timer is None:
+                self._timer = loop.call_later(self.max_wait - waited, self._on_timer)
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        self._running = True
+        asyncio.ensure_future(self._run(batch))
+
+    def _on_timer(self):
+        self._timer = None
+        self._maybe_dispatch()
+
+    async def _run(self, batch):
+        items = [item for item, _, _ in batch]
+        self.counters["items"] += len(items)
+        self.counters["batches"] += 1
+        self.counters["max_batch"] = max(self.counters["max_batch"], len(items))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.batch_fn, items)
+            results = list(results)
+            if len(results) != len(items):
+                # Results cannot be matched to callers; fail the batch rather than leave futures pending
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._running = False
+            # Items that arrived meanwhile have usually waited long enough to go right away
+            self._maybe_dispatch()
+
+    def stats(self):
+        batches = self.counters["batches"]
+        return {**self.counters, "mean_batch": self.counters["items"] / batches if batches else 0.0,
+                "queued": len(self._pending)}
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,112 @@
+# model_registry.py
+# Process-wide registry of heavy models. Each model is loaded on first use (not at import),
+# then kept for the lifetime of the process. Python modules stay imported across Streamlit
+# reruns, so loaded models survive reruns and are shared by all sessions, the same way
+# st.cache_resource objects are.
+import gc
+import os
+import threading
+import time
+
+
+def _rss_bytes():
+    """
+    Current resident set size of this process, or None when it cannot be read.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _tensor_bytes(obj):
+    """
+    Bytes held by a tensor, or by the parameters and buffers of a torch module (0 for anything else).
+    """
+    if hasattr(obj, "numel") and hasattr(obj, "element_size"):
+        return obj.numel() * obj.element_size()
+    parameters = getattr(obj, "parameters", None)
+    buffers = getattr(obj, "buffers", None)
+    if not callable(parameters) or not callable(buffers):
+        return 0
+    total = 0
+    for tensor in list(parameters()) + list(buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        """
+        loader: function with no arguments returning the loaded model (any object,
+        e.g. a (processor, model) tuple). It is not called until the model is needed.
+        """
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        # Per-model lock: concurrent first requests load the model once
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+                model = self._loaders[name]()
+                load_seconds = time.perf_counter() - start
+                rss_after = _rss_bytes()
+
+                parts = model if isinstance(model, tuple) else (model,)
+                self._stats[name] = {
+                    "load_seconds": load_seconds,
+                    "tensor_bytes": sum(_tensor_bytes(part) for part in parts),
+                    "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None
+                }
+                self._models[name] = model
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warmup(self, names=None):
+        """
+        Load the given models (default: all registered) ahead of the first request.
+        """
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def unload(self, name=None):
+        """
+        Drop one model (default: all of them) so its memory can be reclaimed.
+        It is reloaded on next use.
+        """
+        names = [name] if name else list(self._models)
+        for model_name in names:
+            with self._locks[model_name]:
+                self._models.pop(model_name, None)
+                self._stats.pop(model_name, None)
+        gc.collect()
+
+    def stats(self):
+        """
+        {name: {"loaded", "load_seconds", "tensor_bytes", "rss_delta_bytes"}} for every registered model.
+        """
+        return {
+            name: {"loaded": name in self._models, **self._stats.get(name, {})}
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
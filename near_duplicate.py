@@ -0,0 +1,268 @@
+# near_duplicate.py
+# SimHash index of previously classified texts. Lightly mutated copies of a known text
+# (extra punctuation, casing, swapped words) get the prior verdict without an API call.
+# SimHash cannot tell "I will hurt you" from "I will not hurt you", so an entry only matches
+# texts with the same set of negation words (prefilter.NEGATIONS and other "n't" forms).
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from prefilter import NEGATIONS
+
+INDEX_PATH = os.environ.get("NEAR_DUPLICATE_PATH", "data/near_duplicates.bin")
+# Minimum similarity (1 - hamming_distance / 64) for a prior verdict to be reused
+SIMILARITY_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.95))
+# Very short texts flip meaning with a single word ("I love you" / "I don't love you"), never match them
+MIN_TOKENS = 6
+
+FINGERPRINT_BITS = 64
+_FORMAT_VERSION = 2
+_TOKEN_RE = re.compile(r"\w+")
+_NEGATION_RE = re.compile(r"[a-z']+")
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fingerprint(text):
+    """
+    64-bit SimHash over lowercased word tokens (punctuation is ignored, word order does not matter).
+    Returns None for texts shorter than MIN_TOKENS.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for token, count in Counter(tokens).items():
+        token_hash = _token_hash(token)
+        for bit in range(FINGERPRINT_BITS):
+            if token_hash >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def negation_key(text):
+    """
+    64-bit hash of the negation words in text, 0 when there are none.
+    """
+    words = _NEGATION_RE.findall(text.lower().replace("\u2019", "'"))
+    negations = sorted({word for word in words if word in NEGATIONS or word.endswith("n't")})
+    if not negations:
+        return 0
+    return int.from_bytes(hashlib.blake2b(" ".join(negations).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def max_distance_for(threshold):
+    return int((1 - threshold) * FINGERPRINT_BITS)
+
+
+class SimHashIndex:
+    """
+    Fingerprints within max_distance bits are found with the pigeonhole trick:
+    split the 64 bits into max_distance + 1 bands, any close fingerprint matches
+    at least one band exactly, so a lookup only compares against a few bucket entries.
+    Buckets hold entry ids in compact arrays so millions of fingerprints stay cheap in memory.
+    Each entry also stores its negation_key(); only entries with the query's key match.
+    """
+
+    def __init__(self, max_distance=max_distance_for(SIMILARITY_THRESHOLD)):
+        self.max_distance = max_distance
+        self.num_bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.num_bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._fingerprints = array("Q")
+        self._negations = array("Q")
+        self._verdicts = []
+        self._buckets = [{} for _ in range(self.num_bands)]
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def _bands(self, value):
+        for band in range(self.num_bands):
+            yield band, (value >> (band * self.band_bits)) & self._band_mask
+
+    def add(self, value, verdict, negations=0):
+        """
+        Index value unless a fingerprint within max_distance with the same negation key is
+        already there (it would answer the same lookups), so repeated texts do not grow the
+        index. Returns True if added.
+        """
+        with self._lock:
+            if self.query(value, negations) is not None:
+                return False
+            self._insert(value, negations,
+                         (verdict.get("is_harmful"), verdict.get("category"), verdict.get("explanation")))
+            self.dirty = True
+            return True
+
+    def _insert(self, value, negations, verdict):
+        self._insert_many(array("Q", [value]), array("Q", [negations]), [verdict])
+
+    def _insert_many(self, values, negations, verdicts):
+        """
+        Append entries without the near-duplicate check, band by band (used by load()).
+        """
+        start = len(self._fingerprints)
+        self._fingerprints.extend(values)
+        self._negations.extend(negations)
+        self._verdicts.extend(verdicts)
+        for band, buckets in enumerate(self._buckets):
+            shift, mask = band * self.band_bits, self._band_mask
+            for entry_id, value in enumerate(values, start):
+                key = value >> shift & mask
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = array("I")
+                bucket.append(entry_id)
+
+    def query(self, value, negations=0):
+        """
+        Returns (verdict, distance) for the closest fingerprint within max_distance whose
+        negation key equals negations, or None.
+        """
+        best_id, best_distance = None, self.max_distance + 1
+        for band, key in self._bands(value):
+            for entry_id in self._buckets[band].get(key, ()):
+                if self._negations[entry_id] != negations:
+                    continue
+                distance = (self._fingerprints[entry_id] ^ value).bit_count()
+                if distance < best_distance:
+                    best_id, best_distance = entry_id, distance
+                    if distance == 0:
+                        break
+        if best_id is None:
+            return None
+
+        is_harmful, category, explanation = self._verdicts[best_id]
+        return {"is_harmful": is_harmful, "category": category, "explanation": explanation}, best_distance
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            header = json.dumps({
+                "version": _FORMAT_VERSION,
+                "max_distance": self.max_distance,
+                "count": len(self._fingerprints)
+            }).encode("utf-8")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(len(header).to_bytes(4, "little"))
+                f.write(header)
+                self._fingerprints.tofile(f)
+                self._negations.tofile(f)
+                f.write(json.dumps(self._verdicts, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path, max_distance=None):
+        with open(path, "rb") as f:
+            header = json.loads(f.read(int.from_bytes(f.read(4), "little")))
+            if header["version"] != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported near-duplicate index version: {header['version']}")
+            fingerprints = array("Q")
+            fingerprints.fromfile(f, header["count"])
+            negations = array("Q")
+            negations.fromfile(f, header["count"])
+            verdicts = json.loads(f.read().decode("utf-8"))
+
+        index = cls(header["max_distance"] if max_distance is None else max_distance)
+        # Saved entries were deduplicated by add(), so they go in without a query each
+        index._insert_many(fingerprints, negations, [tuple(verdict) for verdict in verdicts])
+        return index
+
+
+_index = None
+_index_lock = threading.Lock()
+_disabled = os.environ.get("NEAR_DUPLICATE", "on").lower() in ("0", "off", "false")
+
+
+def _load_index(path):
+    if not os.path.exists(path):
+        return SimHashIndex()
+    try:
+        return SimHashIndex.load(path)
+    except ValueError:
+        # Older format (no negation keys): start over, the file is replaced at exit
+        return SimHashIndex()
+
+
+def get_index():
+    """
+    Process-wide index, loaded from INDEX_PATH on first use and saved at exit.
+    Returns None when near-duplicate matching is disabled.
+    """
+    global _index
+    if _disabled:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _load_index(INDEX_PATH)
+                atexit.register(save_index)
+    return _index
+
+
+def set_index(index):
+    """
+    Replace the process-wide index. Pass None to disable near-duplicate matching.
+    """
+    global _index, _disabled
+    _index = index
+    _disabled = index is None
+
+
+def save_index(path=INDEX_PATH):
+    if _index is not None and _index.dirty:
+        _index.save(path)
+
+
+def lookup(text):
+    """
+    Prior verdict for a near-duplicate of text, tagged with cache="near_duplicate"
+    and its similarity, or None.
+    """
+    index = get_index()
+    if index is None:
+        return None
+    value = fingerprint(text)
+    if value is None:
+        return None
+    match = index.query(value, negation_key(text))
+    if match is None:
+        return None
+
+    verdict, distance = match
+    verdict["cache"] = "near_duplicate"
+    verdict["similarity"] = round(1 - distance / FINGERPRINT_BITS, 4)
+    return verdict
+
+
+def remember(text, verdict):
+    index = get_index()
+    if index is None:
+        return
+    value = fingerprint(text)
+    if value is not None:
+        index.add(value, verdict, negation_key(text))
@@ -1,32 +1,65 @@
 import os
+import threading
+
 import boto3
 from botocore.exceptions import ClientError
 
-ses_client = boto3.client(
-    "ses",
-    region_name="eu-west-1"
-    # aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    # aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
+import telemetry
 
 FROM_EMAIL = os.getenv("SES_FROM_EMAIL")
 SUBJECT = "Safety Alert"
+# Optional: send to another SES endpoint (e.g. LocalStack or the benchmark stand-in)
+SES_ENDPOINT_URL = os.getenv("SES_ENDPOINT_URL")
+
+_ses_client = None
+_lock = threading.Lock()
+
+
+def get_ses_client():
+    """
+    The shared SES client, created on first use so importing this module needs no AWS setup.
+    """
+    global _ses_client
+    if _ses_client is None:
+        with _lock:
+            if _ses_client is None:
+                _ses_client = boto3.client(
+                    "ses",
+                    region_name="eu-west-1",
+                    endpoint_url=SES_ENDPOINT_URL
+                    # aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                    # aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+                )
+    return _ses_client
+
+
+def set_ses_client(client):
+    """
+    Replace the shared SES client; None recreates it on next use.
+    """
+    global _ses_client
+    with _lock:
+        _ses_client = client
+
 
 def notify_contact(to_email, message):
     if not FROM_EMAIL:
         raise ValueError("FROM_EMAIL is not set or is None")
     try:
-        response = ses_client.send_email(
-            Source=FROM_EMAIL, # has to be confirmed - aws ses verify-email-identity --email-address no-reply@myapp.com --region eu-west-1
-            Destination={"ToAddresses": [to_email]},
-            Message={
-                "Subject": {"Data": SUBJECT}, # 'Safety Alert'
-                "Body": {"Text": {"Data": message}}
-            }
-        )
+        with telemetry.span("notify.send"):
+            response = get_ses_client().send_email(
+                Source=FROM_EMAIL, # has to be confirmed - aws ses verify-email-identity --email-address no-reply@myapp.com --region eu-west-1
+                Destination={"ToAddresses": [to_email]},
+                Message={
+                    "Subject": {"Data": SUBJECT}, # 'Safety Alert'
+                    "Body": {"Text": {"Data": message}}
+                }
+            )
+        telemetry.count("notifications_total", status="sent")
         print("Email sent! Message ID:", response['MessageId'])
         return True
     except ClientError as e:
+        telemetry.count("notifications_total", status="failed")
         print("Error sending email:", e.response['Error']['Message'])
         return False
 
@@ -0,0 +1,93 @@
+# orchestrator.py
+# Runs the independent text analyses concurrently instead of one after another:
+# check_safety and analyze_text_for_distress start together, and fix_text starts as soon as
+# the safety verdict comes back harmful. Results are yielded as each stage finishes, so the
+# UI can render them right away, together with per-stage timings. The rewrite is streamed
+# (fixer.fix_text_stream), so its partial text is yielded as it arrives.
+# Each stage runs in an analysis.<stage> span (telemetry.py) in the caller's trace.
+import contextvars
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+# Shared by every analysis in the process; each analysis uses at most 2 workers at a time
+MAX_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="text-analysis")
+
+
+def _default_stages():
+    from fixer import fix_text_stream
+    from safety_checker import check_safety
+    from text_analyzer import analyze_text_for_distress
+    return check_safety, analyze_text_for_distress, fix_text_stream
+
+
+def _is_harmful(result):
+    return isinstance(result, dict) and str(result.get("is_harmful", "")).lower() == "yes"
+
+
+def run_text_analysis(text, safety_fn=None, distress_fn=None, fix_fn=None):
+    """
+    Yields one event per stage as it completes, in completion order:
+      {"stage": "safety" | "distress" | "rewrite", "result": ..., "started": s, "seconds": s}
+    started is the offset from the start of the analysis. A stage that raises yields
+    {"error": message} as its result. The "rewrite" stage only runs for harmful text.
+    A stage function may return an iterator of text chunks instead of a result: each chunk
+    then yields an event with "partial": True and the text so far, and the final event
+    adds "first_chunk_seconds" (time to first token).
+    """
+    if safety_fn is None or distress_fn is None or fix_fn is None:
+        default_safety, default_distress, default_fix = _default_stages()
+        safety_fn = safety_fn or default_safety
+        distress_fn = distress_fn or default_distress
+        fix_fn = fix_fn or default_fix
+
+    events = queue.Queue()
+    origin = time.perf_counter()
+
+    def run_stage(stage, fn):
+        started = time.perf_counter()
+        first_chunk = None
+        with telemetry.span(f"analysis.{stage}") as stage_span:
+            try:
+                result = fn(text)
+                if not isinstance(result, (str, dict)):
+                    chunks = []
+                    for chunk in result:
+                        now = time.perf_counter()
+                        if first_chunk is None:
+                            first_chunk = now - started
+                            stage_span.set("first_chunk_seconds", first_chunk)
+                        chunks.append(chunk)
+                        events.put({"stage": stage, "result": "".join(chunks), "started": started - origin,
+                                    "seconds": now - started, "partial": True})
+                    result = "".join(chunks)
+            except Exception as e:
+                result = {"error": str(e)}
+                stage_span.set("error", str(e))
+        finished = time.perf_counter()
+        event = {"stage": stage, "result": result, "started": started - origin, "seconds": finished - started}
+        if first_chunk is not None:
+            event["first_chunk_seconds"] = first_chunk
+        events.put(event)
+
+    def submit(stage, fn):
+        # Run in a copy of the caller's context, so stage spans join its trace
+        _executor.submit(contextvars.copy_context().run, run_stage, stage, fn)
+
+    submit("safety", safety_fn)
+    submit("distress", distress_fn)
+    pending = 2
+    while pending:
+        event = events.get()
+        if event.get("partial"):
+            yield event
+            continue
+        pending -= 1
+        if event["stage"] == "safety" and _is_harmful(event["result"]):
+            submit("rewrite", fix_fn)
+            pending += 1
+        yield event
+
@@ -0,0 +1,165 @@
+# prefilter.py
+# Cheap local stage in front of check_safety. Clear-cut texts are resolved in microseconds:
+# - obviously harmful: a high-confidence phrase from the category lexicons, no negation
+# - obviously safe: the whole text is a stock pleasantry from a small allowlist (greetings,
+#   thanks, goodbyes, acknowledgements), in a plain charset with no sensitive word
+# Everything else (returns None) is escalated to the LLM. Short text is not safe by itself:
+# "gas all the jews" or "I will find where you live" have no lexicon word and must reach the model.
+import os
+import re
+from collections import deque
+
+# Set PREFILTER=off to send everything to the model
+ENABLED = os.environ.get("PREFILTER", "on").lower() not in ("0", "off", "false")
+
+# High-confidence phrases, matched at word boundaries on lowercased text
+HARMFUL_PHRASES = {
+    "self-harm": [
+        "kill myself", "killing myself", "end my life", "ending my life", "want to die",
+        "commit suicide", "slit my wrists", "hang myself", "overdose on purpose"
+    ],
+    "violence": [
+        "i will kill you", "i'm going to kill you", "im going to kill you", "i will hurt you",
+        "i'm going to shoot", "im going to shoot", "i will stab you", "going to blow up the"
+    ],
+    "harassment": [
+        "kill yourself", "kys", "you should die", "go die", "nobody would miss you", "you deserve to die"
+    ]
+}
+
+# Sensitive stems: any occurrence (as a word prefix) keeps a text from being declared safe locally
+SENSITIVE_STEMS = [
+    "kill", "die", "dying", "dead", "death", "suicid", "hurt", "harm", "cut", "blood", "wound",
+    "hate", "stupid", "idiot", "worthless", "ugly", "loser", "shut up",
+    "gun", "knife", "weapon", "shoot", "bomb", "explos", "attack", "fight", "threat", "stab", "murder",
+    "beat", "punch", "choke", "strangl", "torture", "terror", "nazi", "racis", "slave",
+    "rape", "abuse", "assault", "molest", "sex", "nude", "naked", "porn",
+    "drug", "cocaine", "heroin", "meth", "pill", "overdos", "poison", "hang", "jump",
+    "starv", "anorex", "bulimi", "kys"
+]
+
+NEGATIONS = {"not", "never", "no", "don't", "dont", "won't", "wont", "wouldn't", "didn't", "isn't", "stop"}
+
+# Allowlist of benign phrases; a text is safe locally only if it consists entirely of
+# one to three of them (e.g. "hello, how are you?"). Matched on the lowercased words.
+_SAFE_PHRASE = (
+    r"(?:hi|hello|hey|hiya|good (?:morning|afternoon|evening|night))(?: there| everyone| all| guys| friends?)?"
+    r"|(?:thanks|thank you|thx|many thanks)(?: (?:so|very) much| a lot)?(?: for (?:your|the) help)?"
+    r"|how are you(?: doing)?(?: today)?|how's it going|nice to meet you"
+    r"|bye|goodbye|see you(?: later| soon| tomorrow)?|have a (?:nice|good|great) (?:day|evening|weekend)"
+    r"|ok|okay|sure|yes|got it|sounds good|great|cool|nice"
+)
+_SAFE_TEXT = re.compile(rf"(?:{_SAFE_PHRASE})(?: (?:{_SAFE_PHRASE})){{0,2}}")
+# Digits inside words, zero-width characters and non-Latin scripts (possible obfuscation) escalate.
+_PLAIN_CHARSET = re.compile(r"[A-Za-z0-9\s.,!?'\"():;-]*")
+_MIXED_WORD = re.compile(r"[A-Za-z]\d|\d[A-Za-z]")
+_WORD = re.compile(r"[a-z']+")
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: one pass over the text finds every occurrence of every pattern.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {pattern: payload}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern, payload in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((pattern, payload))
+
+        # Breadth-first pass to build failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text):
+        """
+        Yields (start, pattern, payload) for every match.
+        """
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern, payload in self._output[state]:
+                yield end - len(pattern) + 1, pattern, payload
+
+
+def _build_automaton():
+    patterns = {stem: ("sensitive", None) for stem in SENSITIVE_STEMS}
+    for category, phrases in HARMFUL_PHRASES.items():
+        for phrase in phrases:
+            patterns[phrase] = ("harmful", category)
+    return AhoCorasick(patterns)
+
+
+_automaton = _build_automaton()
+
+
+def classify(text):
+    """
+    Returns a check_safety-shaped verdict with tier="prefilter" for clear-cut text,
+    or None when the text must go to the LLM.
+    """
+    if not ENABLED:
+        return None
+
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+    if not words:
+        return None
+
+    harmful_match = None
+    sensitive = False
+    for start, pattern, (kind, category) in _automaton.search(lowered):
+        # Only count matches that start a word ("skill" must not match "kill")
+        if start > 0 and lowered[start - 1].isalnum():
+            continue
+        sensitive = True
+        if kind == "harmful":
+            end = start + len(pattern)
+            if end == len(lowered) or not lowered[end].isalnum():
+                harmful_match = (pattern, category)
+                break
+
+    if harmful_match:
+        if NEGATIONS.intersection(words):
+            return None
+        pattern, category = harmful_match
+        return {
+            "is_harmful": "yes",
+            "category": category,
+            "explanation": f"Matched local {category} lexicon: \"{pattern}\"",
+            "tier": "prefilter"
+        }
+
+    if (not sensitive and _PLAIN_CHARSET.fullmatch(text) and not _MIXED_WORD.search(text)
+            and _SAFE_TEXT.fullmatch(" ".join(words))):
+        return {
+            "is_harmful": "no",
+            "category": "none",
+            "explanation": "Greeting or pleasantry from the local allowlist",
+            "tier": "prefilter"
+        }
+
+    return None
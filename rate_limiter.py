@@ -0,0 +1,355 @@
+# rate_limiter.py
+# Client-side scheduling for Gemini calls, shared by safety_checker, text_analyzer and fixer:
+#   - token buckets for requests per minute and tokens per minute, so bursts are smoothed
+#     out before they turn into 429s
+#   - retries of 429 / 5xx errors with jittered exponential backoff, honoring the server's
+#     Retry-After header or RetryInfo.retryDelay when it sends one
+#   - a circuit breaker that fails fast while the API keeps failing
+# Limits are configured with GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE,
+# GEMINI_BACKOFF_MAX, GEMINI_CIRCUIT_FAILURES and GEMINI_CIRCUIT_RESET (0 disables a limit).
+# Each call is traced (telemetry.py): a gemini.call span with one gemini.request span per attempt,
+# and gemini.throttle / gemini.backoff spans for the time spent waiting.
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+from google.genai import errors
+
+import telemetry
+
+RPM = float(os.environ.get("GEMINI_RPM", 60))
+TPM = float(os.environ.get("GEMINI_TPM", 250_000))
+MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", 5))
+BACKOFF_BASE = float(os.environ.get("GEMINI_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.environ.get("GEMINI_BACKOFF_MAX", 60.0))
+CIRCUIT_FAILURES = int(os.environ.get("GEMINI_CIRCUIT_FAILURES", 5))
+CIRCUIT_RESET = float(os.environ.get("GEMINI_CIRCUIT_RESET", 30.0))
+
+# Expected response size, added to the prompt estimate when reserving tokens
+OUTPUT_TOKEN_ESTIMATE = 256
+RETRYABLE_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling the API while the circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute, holding at most capacity (default: one minute's worth).
+    reserve() takes the amount immediately and returns how long the caller must wait
+    before using it; the balance may go negative, which queues later callers behind it.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def adjust(self, amount):
+        """
+        Give back (positive) or take (negative) tokens, e.g. once the real usage is known.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_seconds.
+    Then one trial call is let through (half-open): success closes the circuit, failure reopens it.
+    GeminiScheduler records an attempt cancelled before it finished as a failure, so a cancelled
+    trial call reopens the circuit instead of leaving it half-open.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURES, reset_seconds=CIRCUIT_RESET, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and self.clock() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                return True
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or 0 < self.failure_threshold <= self._failures:
+                self.state = "open"
+                self._opened_at = self.clock()
+
+
+def _parse_seconds(value):
+    try:
+        return max(0.0, float(str(value).strip().rstrip("s")))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(error):
+    """
+    Seconds the server asked us to wait, from the Retry-After header or the
+    google.rpc.RetryInfo retryDelay in the error body, or None.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        delay = _parse_seconds(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            if isinstance(detail, dict) and "retryDelay" in detail:
+                return _parse_seconds(detail["retryDelay"])
+    return None
+
+
+def is_retryable(error):
+    if isinstance(error, errors.APIError):
+        return getattr(error, "code", None) in RETRYABLE_CODES
+    # Connection resets and timeouts before any response
+    return isinstance(error, httpx.TransportError)
+
+
+def estimate_tokens(prompt):
+    # ~4 characters per token, plus room for the response
+    return len(str(prompt)) // 4 + OUTPUT_TOKEN_ESTIMATE
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+class GeminiScheduler:
+    """
+    Runs API calls under the request/token buckets, retry policy and circuit breaker.
+    call() is for blocking functions, acall() for coroutine functions; both return the
+    function's result or raise its last error (CircuitOpenError while the circuit is open).
+    """
+
+    def __init__(self, rpm=RPM, tpm=TPM, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, breaker=None, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, clock=clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock=clock) if tpm else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "cancelled": 0,
+                         "rejected": 0, "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+        telemetry.count(f"gemini_{name}_total", amount)
+
+    def _admit(self, estimated_tokens):
+        """
+        Check the breaker and reserve from the buckets. Returns the seconds to wait before calling.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Gemini API circuit is open after repeated failures, try again later")
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait:
+            self._count("throttled_seconds", wait)
+        return wait
+
+    def _on_success(self, response, estimated_tokens):
+        self.breaker.record_success()
+        actual = _usage_tokens(response)
+        if self.tokens and actual is not None:
+            self.tokens.adjust(estimated_tokens - actual)
+
+    def _on_interrupted(self):
+        """
+        An admitted attempt ended without an outcome (cancelled, e.g. by asyncio.wait_for, or
+        interrupted). Counted as a failure, so a half-open probe cannot leave the circuit stuck.
+        """
+        self.breaker.record_failure()
+        self._count("cancelled")
+
+    def _backoff(self, error, attempt):
+        """
+        Seconds to wait before retry number attempt + 1, or None if the error is final.
+        """
+        telemetry.count("gemini_errors_total", code=getattr(error, "code", None) or type(error).__name__)
+        if isinstance(error, errors.APIError) and (getattr(error, "code", None) or 500) < 500:
+            # The API answered: 4xx errors (quota included) say nothing about its health
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._count("failures")
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = server_delay + random.uniform(0, self.backoff_base)
+        self._count("retries")
+        self._count("backoff_seconds", delay)
+        return delay
+
+    def call(self, fn, *args, estimated_tokens=0, **kwargs):
+        self._count("calls")
+        attempt = 0
+        with telemetry.span("gemini.call", model=kwargs.get("model")) as call_span:
+            while True:
+                wait = self._admit(estimated_tokens)
+                recorded = False
+                try:
+                    if wait:
+                        with telemetry.span("gemini.throttle"):
+                            time.sleep(wait)
+                    self._count("attempts")
+                    try:
+                        with telemetry.span("gemini.request", attempt=attempt):
+                            response = fn(*args, **kwargs)
+                    except Exception as e:
+                        recorded = True
+                        delay = self._backoff(e, attempt)
+                        if delay is None:
+                            raise
+                        with telemetry.span("gemini.backoff"):
+                            time.sleep(delay)
+                        attempt += 1
+                        continue
+                    recorded = True
+                    self._on_success(response, estimated_tokens)
+                    call_span.set("attempts", attempt + 1)
+                    return response
+                finally:
+                    if not recorded:
+                        self._on_interrupted()
+
+    async def acall(self, fn, *args, estimated_tokens=0, **kwargs):
+        self._count("calls")
+        attempt = 0
+        with telemetry.span("gemini.call", model=kwargs.get("model")) as call_span:
+            while True:
+                wait = self._admit(estimated_tokens)
+                recorded = False
+                try:
+                    if wait:
+                        with telemetry.span("gemini.throttle"):
+                            await asyncio.sleep(wait)
+                    self._count("attempts")
+                    try:
+                        with telemetry.span("gemini.request", attempt=attempt):
+                            response = await fn(*args, **kwargs)
+                    except Exception as e:
+                        recorded = True
+                        delay = self._backoff(e, attempt)
+                        if delay is None:
+                            raise
+                        with telemetry.span("gemini.backoff"):
+                            await asyncio.sleep(delay)
+                        attempt += 1
+                        continue
+                    recorded = True
+                    self._on_success(response, estimated_tokens)
+                    call_span.set("attempts", attempt + 1)
+                    return response
+                finally:
+                    if not recorded:
+                        self._on_interrupted()
+
+    def stats(self):
+        return {
+            **self.counters,
+            "circuit": self.breaker.state,
+            "requests_available": self.requests.available() if self.requests else None,
+            "tokens_available": self.tokens.available() if self.tokens else None
+        }
+
+
+scheduler = GeminiScheduler()
+
+
+def get_scheduler():
+    return scheduler
+
+
+def set_scheduler(new_scheduler):
+    """
+    Replace the shared scheduler; None sends calls straight to the API (e.g. in offline benchmarks).
+    """
+    global scheduler
+    scheduler = new_scheduler
+
+
+def call(fn, *args, estimated_tokens=0, **kwargs):
+    """
+    fn(*args, **kwargs) through the shared scheduler.
+    """
+    if scheduler is None:
+        with telemetry.span("gemini.request", model=kwargs.get("model")):
+            return fn(*args, **kwargs)
+    return scheduler.call(fn, *args, estimated_tokens=estimated_tokens, **kwargs)
+
+
+async def acall(fn, *args, estimated_tokens=0, **kwargs):
+    """
+    await fn(*args, **kwargs) through the shared scheduler.
+    """
+    if scheduler is None:
+        with telemetry.span("gemini.request", model=kwargs.get("model")):
+            return await fn(*args, **kwargs)
+    return await scheduler.acall(fn, *args, estimated_tokens=estimated_tokens, **kwargs)
+
+
+def generate_content(api_client, model, contents, **kwargs):
+    """
+    api_client.models.generate_content through the shared scheduler.
+    """
+    return call(api_client.models.generate_content, model=model, contents=contents,
+                estimated_tokens=estimate_tokens(contents), **kwargs)
+
+
+async def generate_content_async(api_client, model, contents, **kwargs):
+    """
+    api_client.aio.models.generate_content through the shared scheduler.
+    """
+    return await acall(api_client.aio.models.generate_content, model=model, contents=contents,
+                       estimated_tokens=estimate_tokens(contents), **kwargs)
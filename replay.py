@@ -0,0 +1,311 @@
+# replay.py
+# Record/replay of Gemini calls, so the pipeline can be benchmarked offline and deterministically.
+#   RecordingClient(client, path) - passes calls through to a real client and appends each
+#                                   request/response pair, with its latency, to a cassette file
+#   ReplayClient(path)            - serves the recorded responses without network or credentials
+# A cassette is JSON Lines, one call per line. Calls are matched on a hash of the model, prompt
+# and response format; repeated identical calls are served in recorded order. Recorded API
+# errors are raised again on replay, so retries behave as they did.
+# gemini_client.get_client() returns one of these when GEMINI_CASSETTE is set
+# (GEMINI_CASSETTE_MODE=record or replay).
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from google.genai import errors
+
+
+def _config_key(config):
+    if config is None:
+        return None
+    schema = getattr(config, "response_schema", None)
+    return {
+        "response_mime_type": getattr(config, "response_mime_type", None),
+        "response_schema": schema if isinstance(schema, (dict, type(None))) else repr(schema)
+    }
+
+
+def request_key(model, contents, config=None):
+    # Streaming and non-streaming calls share keys: the same prompt gets the same answer
+    payload = json.dumps([model, contents, _config_key(config)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayUsage:
+    def __init__(self, prompt_token_count=None, candidates_token_count=None, total_token_count=None):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = total_token_count
+
+
+class ReplayResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = ReplayUsage(**(usage or {}))
+
+
+def _usage_dict(response):
+    usage = getattr(response, "usage_metadata", None)
+    return {name: getattr(usage, name, None)
+            for name in ("prompt_token_count", "candidates_token_count", "total_token_count")}
+
+
+def _error_dict(error):
+    if isinstance(error, errors.APIError):
+        return {"code": error.code, "details": getattr(error, "details", None)}
+    return {"code": None, "details": None, "message": str(error)}
+
+
+def _raise_recorded(error):
+    code = error.get("code")
+    if code is None:
+        raise ConnectionError(error.get("message", "Recorded connection error"))
+    raise (errors.ServerError if code >= 500 else errors.ClientError)(code, error.get("details"))
+
+
+class Cassette:
+    """
+    Append-only JSON Lines file of recorded calls, safe to write from several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def load(self):
+        entries = defaultdict(list)
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["key"]].append(entry)
+        return entries
+
+
+# ------------------- Recording -------------------
+
+class _RecordingModels:
+    def __init__(self, recorder, models):
+        self._recorder = recorder
+        self._models = models
+
+    def generate_content(self, model, contents, config=None):
+        start = time.perf_counter()
+        try:
+            response = self._models.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            self._recorder.record(model, contents, config, start, error=e)
+            raise
+        self._recorder.record(model, contents, config, start, response=response)
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        start = time.perf_counter()
+        chunks, offsets, usage = [], [], None
+        try:
+            for chunk in self._models.generate_content_stream(model=model, contents=contents, config=config):
+                offsets.append(time.perf_counter() - start)
+                chunks.append(chunk.text or "")
+                usage = _usage_dict(chunk)
+                yield chunk
+        except Exception as e:
+            self._recorder.record(model, contents, config, start, error=e, chunks=chunks, offsets=offsets)
+            raise
+        self._recorder.record(model, contents, config, start, chunks=chunks, offsets=offsets, usage=usage)
+
+
+class _RecordingAsyncModels:
+    def __init__(self, recorder, models):
+        self._recorder = recorder
+        self._models = models
+
+    async def generate_content(self, model, contents, config=None):
+        start = time.perf_counter()
+        try:
+            response = await self._models.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            self._recorder.record(model, contents, config, start, error=e)
+            raise
+        self._recorder.record(model, contents, config, start, response=response)
+        return response
+
+
+class _Aio:
+    def __init__(self, models):
+        self.models = models
+
+
+class RecordingClient:
+    """
+    Wraps a genai.Client (or anything with the same models / aio.models calls) and records every call.
+    """
+
+    def __init__(self, client, path):
+        self.cassette = Cassette(path)
+        self.models = _RecordingModels(self, client.models)
+        self.aio = _Aio(_RecordingAsyncModels(self, client.aio.models))
+
+    def record(self, model, contents, config, start, response=None, error=None, chunks=None, offsets=None,
+               usage=None):
+        entry = {
+            "key": request_key(model, contents, config),
+            "model": model,
+            "prompt_preview": str(contents)[:200],
+            "latency": time.perf_counter() - start
+        }
+        if response is not None:
+            entry["text"] = response.text
+            entry["usage"] = _usage_dict(response)
+        if chunks is not None:
+            entry["text"] = "".join(chunks)
+            entry["chunks"] = chunks
+            entry["chunk_offsets"] = offsets
+            entry["usage"] = usage
+        if error is not None:
+            entry["error"] = _error_dict(error)
+        self.cassette.append(entry)
+
+
+# ------------------- Replay -------------------
+
+class ReplayMissError(LookupError):
+    """
+    Raised when a request has no recording in the cassette.
+    """
+
+
+class _ReplayModels:
+    def __init__(self, replay):
+        self._replay = replay
+
+    def generate_content(self, model, contents, config=None):
+        entry = self._replay.next_entry(model, contents, config)
+        time.sleep(self._replay.latency_for(entry))
+        if "error" in entry:
+            _raise_recorded(entry["error"])
+        return ReplayResponse(entry.get("text"), entry.get("usage"))
+
+    def generate_content_stream(self, model, contents, config=None):
+        entry = self._replay.next_entry(model, contents, config)
+        chunks = entry.get("chunks") or [entry.get("text") or ""]
+        offsets = entry.get("chunk_offsets") or [entry["latency"]] * len(chunks)
+        scale = self._replay.latency_for(entry) / entry["latency"] if entry["latency"] else 0.0
+        elapsed = 0.0
+        for chunk, offset in zip(chunks, offsets):
+            time.sleep(max(0.0, offset * scale - elapsed))
+            elapsed = offset * scale
+            yield ReplayResponse(chunk, entry.get("usage"))
+        if "error" in entry:
+            _raise_recorded(entry["error"])
+
+
+class _ReplayAsyncModels:
+    def __init__(self, replay):
+        self._replay = replay
+
+    async def generate_content(self, model, contents, config=None):
+        entry = self._replay.next_entry(model, contents, config)
+        await asyncio.sleep(self._replay.latency_for(entry))
+        if "error" in entry:
+            _raise_recorded(entry["error"])
+        return ReplayResponse(entry.get("text"), entry.get("usage"))
+
+
+class ReplayClient:
+    """
+    Serves recorded calls from a cassette.
+    latency: "recorded" (sleep as long as the original call took), None for no delay,
+    a number of seconds, or a function(entry) -> seconds for a synthetic distribution.
+    Identical requests recorded several times are replayed in order, then the last one repeats.
+    A request that was never recorded raises ReplayMissError, or goes to fallback (a client) if given.
+    """
+
+    def __init__(self, path, latency="recorded", fallback=None):
+        self.path = path
+        self.latency = latency
+        self.fallback = fallback
+        self.calls = 0
+        self.misses = 0
+        self._entries = Cassette(path).load()
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+        self.models = _ReplayModels(self)
+        self.aio = _Aio(_ReplayAsyncModels(self))
+
+    def next_entry(self, model, contents, config=None):
+        key = request_key(model, contents, config)
+        with self._lock:
+            self.calls += 1
+            recorded = self._entries.get(key)
+            if not recorded:
+                self.misses += 1
+            else:
+                position = self._positions[key]
+                self._positions[key] = position + 1
+                return recorded[min(position, len(recorded) - 1)]
+        if self.fallback is not None:
+            return self._fallback_entry(model, contents, config)
+        raise ReplayMissError(f"No recording in {self.path} for {model} prompt {str(contents)[:80]!r}")
+
+    def _fallback_entry(self, model, contents, config):
+        start = time.perf_counter()
+        response = self.fallback.models.generate_content(model=model, contents=contents, config=config)
+        # The fallback call already took its time
+        return {"text": response.text, "usage": _usage_dict(response), "latency": time.perf_counter() - start,
+                "replayed_latency": 0.0}
+
+    def latency_for(self, entry):
+        if "replayed_latency" in entry:
+            return entry["replayed_latency"]
+        if self.latency == "recorded":
+            return entry["latency"]
+        if self.latency is None:
+            return 0.0
+        if callable(self.latency):
+            return self.latency(entry)
+        return float(self.latency)
+
+    def stats(self):
+        return {"calls": self.calls, "misses": self.misses,
+                "recorded_requests": sum(len(entries) for entries in self._entries.values())}
+
+
+def lognormal_latency(median, sigma=0.5, seed=0):
+    """
+    Synthetic latency for ReplayClient: seconds drawn from a seeded log-normal distribution
+    (long right tail, like real API latencies), the same sequence on every run.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def latency(entry=None):
+        with lock:
+            return rng.lognormvariate(math.log(median), sigma)
+    return latency
+
+
+def parse_latency(value):
+    """
+    ReplayClient latency from a string: "recorded", "none", seconds ("0.2") or "lognormal:<median>[:<sigma>]".
+    """
+    value = (value or "recorded").strip().lower()
+    if value in ("recorded", "none"):
+        return None if value == "none" else value
+    if value.startswith("lognormal:"):
+        return lognormal_latency(*(float(part) for part in value.split(":")[1:]))
+    return float(value)
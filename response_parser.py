@@ -0,0 +1,274 @@
+# response_parser.py
+# One parser for every model response (check_safety, packed batches, analyze_text_for_distress,
+# the combined analyzer). The JSON value is located with str.find and decoded in place with
+# json.JSONDecoder.raw_decode, so Markdown fences and prose around it are skipped without
+# regex passes or copies of the response. The decoded value is validated into a typed result
+# with enum-normalized fields ("Yes." -> yes, "Moderate" -> medium, ...), and converted to the
+# plain dicts the rest of the app uses. Each response is parsed once, and parsed dicts are what
+# gets cached.
+# The *_SCHEMA constants describe the same results as Gemini response schemas, for
+# schema-constrained JSON output (see gemini_client.json_config).
+import json
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+
+import telemetry
+
+_decoder = json.JSONDecoder()
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class Harmful(str, Enum):
+    YES = "yes"
+    NO = "no"
+    UNKNOWN = "unknown"
+
+
+class RiskLevel(str, Enum):
+    NONE = "none"
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    UNKNOWN = "unknown"
+
+
+class Sentiment(str, Enum):
+    POSITIVE = "positive"
+    NEGATIVE = "negative"
+    NEUTRAL = "neutral"
+    UNKNOWN = "unknown"
+
+
+# Spellings models actually use, mapped to the enum value
+_HARMFUL_ALIASES = {"true": "yes", "harmful": "yes", "unsafe": "yes", "false": "no", "not harmful": "no",
+                    "safe": "no", "none": "no"}
+_RISK_ALIASES = {"no risk": "none", "minimal": "low", "moderate": "medium", "severe": "high",
+                 "critical": "high", "urgent": "high"}
+_SENTIMENT_ALIASES = {"mixed": "neutral"}
+
+
+_SAFETY_PROPERTIES = {
+    "is_harmful": {"type": "STRING", "enum": ["yes", "no"]},
+    "category": {"type": "STRING", "description": "violence, hate, self-harm, etc, or none"},
+    "explanation": {"type": "STRING", "description": "short reason"}
+}
+SAFETY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": _SAFETY_PROPERTIES,
+    "required": ["is_harmful", "category", "explanation"]
+}
+PACKED_SAFETY_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "INTEGER"}, **_SAFETY_PROPERTIES},
+        "required": ["id", "is_harmful", "category", "explanation"]
+    }
+}
+DISTRESS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "sentiment": {"type": "STRING", "enum": ["positive", "negative", "neutral"]},
+        "risk_level": {"type": "STRING", "enum": ["none", "low", "medium", "high"]},
+        "explanation": {"type": "STRING", "description": "short description"},
+        "recommended_actions": {"type": "ARRAY", "items": {"type": "STRING"}}
+    },
+    "required": ["sentiment", "risk_level", "explanation", "recommended_actions"]
+}
+COMBINED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "safety": SAFETY_SCHEMA,
+        "rewrite": {"type": "STRING", "nullable": True,
+                    "description": "safe, calm and neutral rewrite if is_harmful is yes, otherwise null"},
+        "distress": DISTRESS_SCHEMA
+    },
+    "required": ["safety", "distress"]
+}
+
+
+def _normalize(enum, value, aliases):
+    if isinstance(value, bool):
+        value = "yes" if value else "no"
+    text = str(value).strip().lower().rstrip(".!") if value is not None else ""
+    text = aliases.get(text, text)
+    # "high risk", "medium-high" -> first known word
+    for word in (text, *re.split(r"[\s_/-]+", text)):
+        try:
+            return enum(word)
+        except ValueError:
+            continue
+    return enum.UNKNOWN
+
+
+@dataclass(slots=True)
+class SafetyResult:
+    is_harmful: Harmful
+    category: str
+    explanation: str
+    parse_error: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or "is_harmful" not in data:
+            return cls.failed()
+        return cls(
+            is_harmful=_normalize(Harmful, data.get("is_harmful"), _HARMFUL_ALIASES),
+            category=str(data.get("category") or "none").strip(),
+            explanation=str(data.get("explanation") or "").strip()
+        )
+
+    @classmethod
+    def failed(cls):
+        telemetry.count("parse_errors_total", kind="safety")
+        return cls(Harmful.UNKNOWN, "unknown", "Parsing error", parse_error=True)
+
+    def to_dict(self):
+        return {"is_harmful": self.is_harmful.value, "category": self.category, "explanation": self.explanation}
+
+
+@dataclass(slots=True)
+class DistressResult:
+    sentiment: Sentiment
+    risk_level: RiskLevel
+    explanation: str
+    recommended_actions: list = field(default_factory=list)
+    parse_error: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or not ("risk_level" in data or "sentiment" in data):
+            return cls.failed()
+        actions = data.get("recommended_actions") or []
+        if isinstance(actions, str):
+            actions = [actions]
+        return cls(
+            sentiment=_normalize(Sentiment, data.get("sentiment"), _SENTIMENT_ALIASES),
+            risk_level=_normalize(RiskLevel, data.get("risk_level"), _RISK_ALIASES),
+            explanation=str(data.get("explanation") or "No explanation provided.").strip(),
+            recommended_actions=[str(action) for action in actions if action]
+        )
+
+    @classmethod
+    def failed(cls):
+        telemetry.count("parse_errors_total", kind="distress")
+        return cls(Sentiment.UNKNOWN, RiskLevel.UNKNOWN, "Failed to parse API response", parse_error=True)
+
+    def to_dict(self):
+        result = {
+            "sentiment": self.sentiment.value,
+            "risk_level": self.risk_level.value,
+            "explanation": self.explanation,
+            "recommended_actions": list(self.recommended_actions)
+        }
+        if self.parse_error:
+            result["parse_error"] = True
+        return result
+
+
+def _balanced_end(raw, start):
+    """
+    Index just past the bracket closing raw[start], skipping brackets inside strings, or None.
+    """
+    stack = [_CLOSERS[raw[start]]]
+    in_string = escaped = False
+    for i in range(start + 1, len(raw)):
+        char = raw[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i + 1
+    return None
+
+
+def extract_json(raw, kind=dict):
+    """
+    The first JSON object (kind=dict) or array (kind=list) in raw, or None.
+    Handles ```json fences, prose before or after the JSON, and trailing commas.
+    """
+    if not raw:
+        return None
+    opener = "{" if kind is dict else "["
+    start = raw.find(opener)
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(raw, start)
+            if isinstance(value, kind):
+                return value
+        except ValueError:
+            # Slow path, only for invalid JSON: cut out the balanced value and repair it
+            end = _balanced_end(raw, start)
+            if end is not None:
+                try:
+                    value = json.loads(_TRAILING_COMMA.sub(r"\1", raw[start:end]))
+                    if isinstance(value, kind):
+                        return value
+                except ValueError:
+                    pass
+        start = raw.find(opener, start + 1)
+    return None
+
+
+@telemetry.traced("parse.safety")
+def parse_safety(raw):
+    """
+    SafetyResult from a check_safety response (SafetyResult.failed() if it cannot be parsed).
+    """
+    return SafetyResult.from_dict(extract_json(raw))
+
+
+@telemetry.traced("parse.distress")
+def parse_distress(raw):
+    """
+    DistressResult from an analyze_text_for_distress response.
+    """
+    return DistressResult.from_dict(extract_json(raw))
+
+
+@telemetry.traced("parse.packed")
+def parse_packed(raw, count):
+    """
+    Demultiplex a packed check_safety response into {id: SafetyResult}.
+    Entries that are missing or malformed are left out, so the caller can retry them alone.
+    """
+    entries = extract_json(raw, kind=list) or []
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id = entry.get("id")
+        if isinstance(item_id, str) and item_id.isdigit():
+            item_id = int(item_id)
+        if not isinstance(item_id, int) or not 0 <= item_id < count:
+            continue
+        if not all(key in entry for key in ("is_harmful", "category", "explanation")):
+            continue
+        results[item_id] = SafetyResult.from_dict(entry)
+    return results
+
+
+@telemetry.traced("parse.combined")
+def parse_combined(raw):
+    """
+    (SafetyResult, rewrite or None, DistressResult) from a combined_analyzer response.
+    """
+    data = extract_json(raw) or {}
+    safety = SafetyResult.from_dict(data.get("safety"))
+    distress = DistressResult.from_dict(data.get("distress"))
+    rewrite = data.get("rewrite")
+    if safety.is_harmful is not Harmful.YES or not isinstance(rewrite, str) or not rewrite.strip():
+        rewrite = None
+    return safety, rewrite, distress
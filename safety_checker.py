@@ -1,27 +1,23 @@
 # safety_checker.py
-import os
-import json
-import re
-from google import genai  # Google AI Studio Python SDK
+import time
+import asyncio
+import cache
+import gemini_client
+import near_duplicate
+import prefilter
+import rate_limiter
+import response_parser
 
-# Optional: load environment variables from a .env file
-from dotenv import load_dotenv
-load_dotenv()
+MODEL_NAME = "gemini-2.5-flash"
+# Bump when the prompt changes, so cached verdicts from the old prompt are not reused
+PROMPT_VERSION = "1"
 
-# Make sure you set your GOOGLE_API_KEY in environment variables
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+# Default number of texts sent per request in packed mode
+PACK_SIZE = 10
 
-# Initialize the Gemini client
-client = genai.Client(api_key=GOOGLE_API_KEY)
 
-
-def check_safety(text):
-    """
-    Analyze a given text for potential safety risks using Google Gemini API.
-    Returns: is_harmful, category, explanation
-    """
-
-    prompt = f"""
+def _build_prompt(text):
+    return f"""
     You are a safety analysis tool.
     Respond ONLY with valid JSON, no explanation text outside the JSON.
 
@@ -35,41 +31,219 @@ def check_safety(text):
     Analyze this text: "{text}"
     """
 
+
+def _parse_response(raw):
+    return response_parser.parse_safety(raw).to_dict()
+
+
+def _build_packed_prompt(texts):
+    items = "\n".join(f'<item id="{i}">{text}</item>' for i, text in enumerate(texts))
+    return f"""
+    You are a safety analysis tool.
+    Analyze each item below separately.
+    Respond ONLY with a valid JSON array with one object per item, no explanation text outside the JSON.
+
+    Example format:
+    [
+        {{
+            "id": 0,
+            "is_harmful": "yes or no",
+            "category": "violence, hate, self-harm, etc",
+            "explanation": "short reason"
+        }}
+    ]
+
+    Items:
+    {items}
+    """
+
+
+def _parse_packed_response(raw, count):
+    """
+    Demultiplex a packed response into {id: result}.
+    Entries that are missing or malformed are left out, so the caller can retry them alone.
+    """
+    return {item_id: result.to_dict() for item_id, result in response_parser.parse_packed(raw, count).items()}
+
+
+def _generate(api_client, prompt, stats=None, schema=response_parser.SAFETY_SCHEMA):
+    response = rate_limiter.generate_content(api_client, MODEL_NAME, prompt, config=gemini_client.json_config(schema))
+    if stats is not None:
+        usage = getattr(response, "usage_metadata", None)
+        stats["requests"] += 1
+        stats["prompt_tokens"] += getattr(usage, "prompt_token_count", 0) or 0
+        stats["output_tokens"] += getattr(usage, "candidates_token_count", 0) or 0
+    return response.text
+
+
+def _api_error(e):
+    return {
+        "is_harmful": "unknown",
+        "category": "google_api_error",
+        "explanation": str(e)
+    }
+
+
+def _local_verdict(text):
+    """
+    Try to resolve text without an API call: the local pre-filter, the exact-match cache,
+    then the near-duplicate index. The verdict's "tier" records which one decided.
+    """
+    result = prefilter.classify(text)
+    if result is not None:
+        return result
+
+    result_cache = cache.get_cache()
+    if result_cache is not None:
+        result = result_cache.get(cache.cache_key("safety", text, MODEL_NAME, PROMPT_VERSION))
+        if result is not None:
+            result["tier"] = "cache"
+            return result
+
+    result = near_duplicate.lookup(text)
+    if result is not None:
+        result["tier"] = "near_duplicate"
+    return result
+
+
+def _record_llm_verdict(text, result):
+    """
+    Store a verdict from the model in the caches, then mark it tier="llm".
+    """
+    # Parsing and API errors come back as "unknown" and must not be cached
+    if str(result.get("is_harmful", "unknown")).lower() != "unknown":
+        result_cache = cache.get_cache()
+        if result_cache is not None:
+            result_cache.set(cache.cache_key("safety", text, MODEL_NAME, PROMPT_VERSION), result)
+        near_duplicate.remember(text, result)
+    result["tier"] = "llm"
+
+
+def check_safety(text, api_client=None):
+    """
+    Analyze a given text for potential safety risks using Google Gemini API.
+    Clear-cut text is decided by the local pre-filter, results for previously seen text are
+    served from the result cache, and lightly mutated copies of a known text reuse its verdict
+    (tagged cache="near_duplicate"). Only the rest is sent to the model.
+    Returns: is_harmful, category, explanation, tier (prefilter, cache, near_duplicate or llm)
+    """
+    result = _local_verdict(text)
+    if result is None:
+        result = _check_single(text, api_client or gemini_client.get_client())
+        _record_llm_verdict(text, result)
+    return result
+
+
+def _check_single(text, api_client, stats=None):
+    try:
+        return _parse_response(_generate(api_client, _build_prompt(text), stats))
+    except Exception as e:
+        return _api_error(e)
+
+
+async def check_safety_async(text, api_client=None):
+    """
+    Async version of check_safety, built on the genai async client (client.aio).
+    The local tiers read and write SQLite (and load the near-duplicate index on first use),
+    so they run in a worker thread to keep the event loop free.
+    """
+    result = await asyncio.to_thread(_local_verdict, text)
+    if result is not None:
+        return result
+
+    api_client = api_client or gemini_client.get_client()
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
+        response = await rate_limiter.generate_content_async(
+            api_client, MODEL_NAME, _build_prompt(text),
+            config=gemini_client.json_config(response_parser.SAFETY_SCHEMA)
         )
+        result = _parse_response(response.text)
+    except Exception as e:
+        result = _api_error(e)
 
-        raw = response.text.strip()
+    await asyncio.to_thread(_record_llm_verdict, text, result)
+    return result
 
-        # Try direct JSON first
+
+async def check_safety_batch_async(texts, max_concurrency=8, api_client=None):
+    """
+    Check many texts concurrently, with at most max_concurrency requests in flight.
+    Returns a list of results in the same order as texts.
+    Raises ValueError if max_concurrency is below 1.
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+    texts = list(texts)
+    results = [None] * len(texts)
+    # A fixed pool of max_concurrency workers pulls indexes from a shared iterator,
+    # which bounds requests in flight without creating one task per text
+    indexes = iter(range(len(texts)))
+
+    async def worker():
+        for i in indexes:
+            results[i] = await check_safety_async(texts[i], api_client)
+
+    await asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(texts)))))
+    return results
+
+
+def check_safety_batch(texts, max_concurrency=8, api_client=None):
+    """
+    Blocking wrapper around check_safety_batch_async.
+    Must not be called from inside a running event loop (use the async version there).
+    """
+    return asyncio.run(check_safety_batch_async(texts, max_concurrency, api_client))
+
+
+def check_safety_packed(texts, pack_size=PACK_SIZE, api_client=None, stats=None):
+    """
+    Classify texts pack_size at a time, one request per pack, so the prompt overhead
+    is paid once per pack instead of once per text.
+    Items whose entries are missing or malformed in the response fall back to check_safety.
+    Texts resolved locally (pre-filter or caches) are never packed.
+    If a stats dict is passed it is filled with request/token counts, tokens_per_item
+    and items_per_second.
+    Returns a list of results in the same order as texts.
+    """
+    api_client = api_client or gemini_client.get_client()
+    texts = list(texts)
+    counters = {"items": len(texts), "requests": 0, "fallbacks": 0, "resolved_locally": 0,
+                "prompt_tokens": 0, "output_tokens": 0}
+    start = time.perf_counter()
+
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        results[i] = _local_verdict(text)
+        if results[i] is None:
+            pending.append(i)
+    counters["resolved_locally"] = len(texts) - len(pending)
+
+    for offset in range(0, len(pending), pack_size):
+        pack_indexes = pending[offset:offset + pack_size]
+        pack = [texts[i] for i in pack_indexes]
         try:
-            return json.loads(raw)
-        except:
-            pass
-
-        # Fallback: extract JSON part only
-        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except:
-                pass
-
-        # If everything fails
-        return {
-            "is_harmful": "unknown",
-            "category": "unknown",
-            "explanation": "Parsing error"
-        }
+            parsed = _parse_packed_response(_generate(api_client, _build_packed_prompt(pack), counters,
+                                                     response_parser.PACKED_SAFETY_SCHEMA), len(pack))
+        except Exception:
+            parsed = {}
 
-    except Exception as e:
-        return {
-            "is_harmful": "unknown",
-            "category": "google_api_error",
-            "explanation": str(e)
-        }
+        for position, i in enumerate(pack_indexes):
+            result = parsed.get(position)
+            if result is None:
+                counters["fallbacks"] += 1
+                result = _check_single(texts[i], api_client, counters)
+            _record_llm_verdict(texts[i], result)
+            results[i] = result
+
+    if stats is not None:
+        elapsed = time.perf_counter() - start
+        items = max(counters["items"], 1)
+        stats.update(counters)
+        stats["seconds"] = elapsed
+        stats["tokens_per_item"] = (counters["prompt_tokens"] + counters["output_tokens"]) / items
+        stats["items_per_second"] = counters["items"] / elapsed if elapsed else 0.0
+    return results
 
 
 # # Example usage
@@ -0,0 +1,113 @@
+# server.py
+# HTTP moderation API around the evaluator, for calling it from other services.
+#
+#   uvicorn server:create_app --factory --host 0.0.0.0 --port 8000
+#   python server.py
+#
+#   POST /v1/text/safety     {"text": "..."}  -> check_safety result
+#   POST /v1/text/distress   {"text": "..."}  -> analyze_text_for_distress result
+#   POST /v1/image/analyze   raw image bytes  -> analyze_image_combined result
+#   GET  /metrics            Prometheus metrics     (with EVALUATOR_TELEMETRY=1, see telemetry.py)
+#   GET  /v1/traces          finished spans as OTLP/JSON, removed once returned
+#
+# Concurrent image requests are run as one model batch of up to IMAGE_BATCH_SIZE images
+# (micro_batcher.py), so concurrent callers share forward passes. When the model is idle a
+# request waits at most IMAGE_BATCH_WAIT_MS for others to join it.
+import asyncio
+import io
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from PIL import Image
+from pydantic import BaseModel
+
+import telemetry
+from micro_batcher import MicroBatcher
+
+IMAGE_BATCH_SIZE = int(os.environ.get("IMAGE_BATCH_SIZE", 16))
+IMAGE_BATCH_WAIT_MS = float(os.environ.get("IMAGE_BATCH_WAIT_MS", 5))
+
+
+class TextRequest(BaseModel):
+    text: str
+
+
+def _decode_image(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.convert("RGB")
+
+
+def create_app(safety_fn=None, distress_fn=None, image_batch_fn=None,
+               max_batch_size=IMAGE_BATCH_SIZE, max_wait_ms=IMAGE_BATCH_WAIT_MS):
+    """
+    Build the API. The analyzer functions default to the real ones and can be replaced
+    (e.g. by fakes in benchmarks/load_test.py):
+      safety_fn(text)           -> dict, sync or async (default: check_safety_async)
+      distress_fn(text)         -> dict, sync (default: analyze_text_for_distress)
+      image_batch_fn(images)    -> [dict] (default: analyze_images_batch)
+    """
+    if safety_fn is None:
+        from safety_checker import check_safety_async as safety_fn
+    if distress_fn is None:
+        from text_analyzer import analyze_text_for_distress as distress_fn
+    if image_batch_fn is None:
+        from image_analyzer import analyze_images_batch
+
+        def image_batch_fn(images):
+            return analyze_images_batch(images, batch_size=max_batch_size)
+
+    batcher = MicroBatcher(image_batch_fn, max_batch_size, max_wait_ms)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        batcher.close()
+
+    app = FastAPI(title="AI Safety Evaluator", lifespan=lifespan)
+    app.state.batcher = batcher
+
+    @app.post("/v1/text/safety")
+    async def text_safety(body: TextRequest):
+        if asyncio.iscoroutinefunction(safety_fn):
+            return await safety_fn(body.text)
+        return await asyncio.to_thread(safety_fn, body.text)
+
+    @app.post("/v1/text/distress")
+    async def text_distress(body: TextRequest):
+        try:
+            return await asyncio.to_thread(distress_fn, body.text)
+        except Exception as e:
+            return {"error": f"Distress analysis failed: {e}"}
+
+    @app.post("/v1/image/analyze")
+    async def image_analyze(request: Request):
+        data = await request.body()
+        if not data:
+            raise HTTPException(status_code=400, detail="Request body must be the image bytes")
+        try:
+            image = await asyncio.to_thread(_decode_image, data)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read image: {e}")
+        return await batcher.submit(image)
+
+    @app.get("/v1/stats")
+    async def stats():
+        return {"image_batches": batcher.stats()}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(telemetry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/v1/traces")
+    async def traces():
+        return telemetry.otlp_json()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(create_app(), host=os.environ.get("HOST", "127.0.0.1"), port=int(os.environ.get("PORT", 8000)))
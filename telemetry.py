@@ -0,0 +1,259 @@
+# telemetry.py
+# Spans, counters and histograms for every stage of the pipeline (Gemini calls, retries and
+# backoff, parsing, image preprocessing and forward passes, logging, notifications), so a slow
+# analysis can be traced to the stage that was slow.
+#   EVALUATOR_TELEMETRY=1 turns it on (off by default; enable() switches it at runtime)
+# When off, span() returns a shared no-op and count() / observe() return right away, so the
+# instrumentation costs one global lookup per call.
+# Every span also feeds the evaluator_stage_duration_seconds histogram (label stage=<span name>).
+# Metrics export as Prometheus text (prometheus_text(), served on /metrics by server.py), finished
+# spans as OpenTelemetry OTLP/JSON (otlp_json(), or finished_spans() for the span dicts).
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.environ.get("EVALUATOR_TELEMETRY", "0") == "1"
+# Finished spans kept for export; the oldest are dropped first
+MAX_SPANS = int(os.environ.get("EVALUATOR_TELEMETRY_MAX_SPANS", 10_000))
+SERVICE_NAME = "ai-safety-evaluator"
+PREFIX = "evaluator_"
+
+# Seconds; covers in-process stages (ms) up to Gemini calls with retries (tens of seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_spans = deque(maxlen=MAX_SPANS)
+
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+
+def reset():
+    """
+    Drop every metric and finished span.
+    """
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _spans.clear()
+
+
+# ------------------- Metrics -------------------
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def count(name, amount=1, **labels):
+    """
+    Add amount to the counter name (e.g. "gemini_retries_total").
+    """
+    if not ENABLED:
+        return
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    """
+    Record value in the histogram name (e.g. "gemini_backoff_seconds").
+    """
+    if not ENABLED:
+        return
+    key = (name, _labels_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # [count per bucket..., +Inf count], sum
+            histogram = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+        buckets = histogram[0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[-1] += 1
+        histogram[1] += value
+
+
+# ------------------- Spans -------------------
+
+class Span:
+    """
+    A timed stage. Use through span(); set() adds attributes while it runs.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error",
+                 "_start", "_token")
+
+    def __init__(self, name, attributes):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(seconds * 1e9)
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+            count("stage_errors_total", stage=self.name)
+        observe("stage_duration_seconds", seconds, stage=self.name)
+        with _lock:
+            _spans.append(self)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attributes):
+    """
+    Context manager timing a stage: with telemetry.span("gemini.request", attempt=1): ...
+    Spans opened inside it (same thread or task) become its children.
+    """
+    if not ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name):
+    """
+    Decorator running the function inside span(name).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ------------------- Export -------------------
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def prometheus_text():
+    """
+    Every counter and histogram in the Prometheus text exposition format (version 0.0.4).
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(buckets), total)) for key, (buckets, total) in _histograms.items())
+    lines = []
+    last_name = None
+    for (name, labels), value in counters:
+        if name != last_name:
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            last_name = name
+        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+    for (name, labels), (buckets, total) in histograms:
+        if name != last_name:
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            last_name = name
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + ("+Inf",), buckets):
+            cumulative += bucket_count
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _span_dict(finished):
+    result = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [_attribute(key, value) for key, value in finished.attributes.items() if value is not None],
+        # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+        "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1}
+    }
+    if finished.parent_id:
+        result["parentSpanId"] = finished.parent_id
+    return result
+
+
+def finished_spans(clear=False):
+    """
+    Finished spans as OpenTelemetry span dicts (OTLP/JSON field names), oldest first.
+    """
+    with _lock:
+        spans = list(_spans)
+        if clear:
+            _spans.clear()
+    return [_span_dict(finished) for finished in spans]
+
+
+def otlp_json(clear=True):
+    """
+    Finished spans as an OTLP/JSON ExportTraceServiceRequest, ready to POST to a collector's
+    /v1/traces endpoint. Exported spans are removed unless clear=False.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "telemetry"}, "spans": finished_spans(clear)}]
+        }]
+    }
@@ -0,0 +1,82 @@
+# test_bulk_scan.py
+# Resuming a scan must retry results that failed with an API error (check_safety returns them
+# instead of raising, e.g. while the circuit breaker is open) and skip everything else already done.
+import json
+import sys
+import types
+
+import pytest
+
+import bulk_scan
+
+SAFE = {"is_harmful": "no", "category": "none", "explanation": "ok", "tier": "llm"}
+CIRCUIT_OPEN = {"is_harmful": "unknown", "category": "google_api_error",
+                "explanation": "Gemini API circuit is open after repeated failures, try again later"}
+DISTRESS = {"sentiment": "neutral", "risk_level": "none", "explanation": "ok", "recommended_actions": []}
+
+
+@pytest.fixture
+def analyzers(monkeypatch):
+    """
+    Replaces check_safety and analyze_text_for_distress; set state["down"] to make them fail.
+    """
+    state = {"down": False, "safety_calls": []}
+
+    def check_safety(text):
+        state["safety_calls"].append(text)
+        return dict(CIRCUIT_OPEN) if state["down"] else dict(SAFE)
+
+    def analyze_text_for_distress(text):
+        if state["down"]:
+            raise ConnectionError("API unavailable")
+        return dict(DISTRESS)
+
+    monkeypatch.setitem(sys.modules, "safety_checker",
+                        types.SimpleNamespace(check_safety=check_safety))
+    monkeypatch.setitem(sys.modules, "text_analyzer",
+                        types.SimpleNamespace(analyze_text_for_distress=analyze_text_for_distress))
+    return state
+
+
+def write_texts(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"m{i}", "text": f"message {i}"}) + "\n")
+        f.write('{"id": "bad"}\n')
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_retries_api_errors(tmp_path, analyzers):
+    texts, out = tmp_path / "texts.jsonl", tmp_path / "out.jsonl"
+    write_texts(texts, 5)
+
+    analyzers["down"] = True
+    bulk_scan.main(["--texts", str(texts), "--out", str(out), "--concurrency", "2"])
+    first = read_records(out)
+    assert len(first) == 6
+    assert bulk_scan.load_checkpoint(str(out)) == {"bad"}
+
+    analyzers["down"] = False
+    analyzers["safety_calls"].clear()
+    bulk_scan.main(["--texts", str(texts), "--out", str(out), "--concurrency", "2"])
+    assert sorted(analyzers["safety_calls"]) == [f"message {i}" for i in range(5)]
+    retried = read_records(out)[len(first):]
+    assert sorted(record["id"] for record in retried) == [f"m{i}" for i in range(5)]
+    assert all(record["safety"]["is_harmful"] == "no" and record["distress"] == DISTRESS for record in retried)
+    assert bulk_scan.load_checkpoint(str(out)) == {"bad"} | {f"m{i}" for i in range(5)}
+
+    # Nothing left to do
+    analyzers["safety_calls"].clear()
+    bulk_scan.main(["--texts", str(texts), "--out", str(out)])
+    assert analyzers["safety_calls"] == []
+
+
+def test_distress_error_alone_is_retried():
+    record = {"id": "m1", "type": "text", "safety": dict(SAFE), "distress": {"error": "timeout"}}
+    assert bulk_scan.needs_retry(record)
+    assert not bulk_scan.needs_retry({**record, "distress": DISTRESS})
+    assert not bulk_scan.needs_retry({"id": "bad", "type": "text", "error": "Missing or non-text field 'text'"})
@@ -0,0 +1,39 @@
+# test_cache.py
+# The memory tier must honour the cache TTL, including for entries promoted from disk, which
+# keep the disk entry's expiry instead of getting a fresh one.
+import time
+
+import cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_entries_expire_after_ttl():
+    clock = FakeClock()
+    memory = cache.MemoryCache(ttl=60, clock=clock)
+    memory.set("key", '"value"')
+    clock.now += 59
+    assert memory.get("key") == '"value"'
+    clock.now += 1
+    assert memory.get("key") is None
+    assert len(memory) == 0
+
+
+def test_disk_hit_promoted_to_memory_keeps_disk_expiry(tmp_path):
+    disk = cache.SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=1)
+    result_cache = cache.ResultCache(cache.MemoryCache(ttl=1), disk)
+    disk.set("key", '{"is_harmful": "no"}')
+    # Written 0.9 s ago, so 0.1 s of its TTL is left
+    disk._conn.execute("UPDATE results SET created = ?", (time.time() - 0.9,))
+
+    assert result_cache.get("key") == {"is_harmful": "no"}
+    assert result_cache.get("key") == {"is_harmful": "no"}
+    assert result_cache.counters["memory_hits"] == 1
+    time.sleep(0.15)
+    assert result_cache.get("key") is None
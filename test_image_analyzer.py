@@ -0,0 +1,53 @@
+# test_image_analyzer.py
+# Importing image_analyzer (and so app.py) must not import torch or transformers; they are only
+# loaded once an image is analyzed.
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+
+def test_import_does_not_load_torch():
+    code = ("import sys, image_analyzer, inference_backends; "
+            "print(sorted(name for name in ('torch', 'transformers', 'onnxruntime') if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_risk_labels_and_embeddings_stay_paired(monkeypatch):
+    import image_analyzer
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    monkeypatch.setattr(image_analyzer, "registry", registry)
+    for name in ("_risk_config", "risk_labels", "risk_prompt_templates"):
+        monkeypatch.setattr(image_analyzer, name, getattr(image_analyzer, name))
+    encoded = []
+    changer = threading.Thread(target=image_analyzer.set_risk_labels, args=(["calm", "weapon"],))
+
+    def fake_encode():
+        labels, templates = image_analyzer._risk_config
+        if not encoded:
+            # Another thread replaces the labels while the first encoding is still running
+            changer.start()
+            while image_analyzer._risk_config[0] == labels:
+                time.sleep(0.001)
+        encoded.append(labels)
+        return labels, templates, [f"embedding of {label}" for label in labels]
+
+    registry.register("clip_risk_text", fake_encode)
+    labels, templates, features = image_analyzer._risk_text()
+    assert labels == ("calm", "weapon")
+    assert features == ["embedding of calm", "embedding of weapon"]
+    changer.join()
+    assert len(encoded) == 2
+
+    image_analyzer.set_risk_labels(["safe", "violent"], templates=["a photo of {}"])
+    labels, templates, features = image_analyzer._risk_text()
+    assert (labels, templates) == (("safe", "violent"), ("a photo of {}",))
+    assert features == ["embedding of safe", "embedding of violent"]
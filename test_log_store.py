@@ -0,0 +1,35 @@
+# test_log_store.py
+# compact_logs must convert rotated logs whose input_text spans several lines (texts come from
+# st.text_area), including files larger than one CSV read block.
+from datetime import datetime, timedelta
+
+import pyarrow.dataset as ds
+
+import log_store
+import logger
+
+ROWS = 30_000
+
+
+def test_compacts_multiline_texts_across_read_blocks(tmp_path, monkeypatch):
+    event_log = logger.EventLog(str(tmp_path / "logs.csv"), flush_every=1000)
+    monkeypatch.setattr(logger, "event_log", event_log)
+    monkeypatch.setattr(log_store, "PARQUET_DIR", str(tmp_path / "parquet"))
+    start = datetime(2024, 5, 1)
+    event_log.write_many({
+        "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        "input_text": f"line one of message {i}\nline two, \"quoted\"\n\nline four",
+        "is_harmful": "yes" if i % 3 == 0 else "no",
+        "category": "violence" if i % 3 == 0 else "none",
+        "explanation": "multi\nline explanation"
+    } for i in range(ROWS))
+    event_log.rotate()
+    # Well above pyarrow's default 1 MB read block
+    rotated, = tmp_path.glob("logs.*.csv")
+    assert rotated.stat().st_size > 2 * 2**20
+
+    assert log_store.compact_logs(include_active=False) == ROWS
+    assert not list(tmp_path.glob("logs.*.csv"))
+    assert log_store.counts_by_category() == {"violence": ROWS // 3, "none": ROWS - ROWS // 3}
+    texts = ds.dataset(log_store.PARQUET_DIR, format="parquet").to_table(columns=["input_text"])
+    assert "line one of message 7\nline two, \"quoted\"\n\nline four" in texts["input_text"].to_pylist()
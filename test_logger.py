@@ -0,0 +1,78 @@
+# test_logger.py
+# AsyncLogWriter must shut down promptly with a full queue under every policy, and its
+# counters must add up when many threads log at once.
+import csv
+import threading
+import time
+
+import pytest
+
+import logger
+
+RESULT = {"is_harmful": "no", "category": "none", "explanation": "test"}
+
+
+def make_writer(tmp_path, **kwargs):
+    event_log = logger.EventLog(str(tmp_path / "logs.csv"), flush_every=10, flush_interval=0.2)
+    return logger.AsyncLogWriter(event_log, **kwargs)
+
+
+def rows(writer):
+    with open(writer.event_log.path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("policy", logger.AsyncLogWriter.POLICIES)
+def test_shutdown_with_full_queue_writes_everything_and_returns(tmp_path, policy):
+    writer = make_writer(tmp_path, max_queue=5, policy=policy, batch_size=2)
+
+    def produce():
+        for i in range(200):
+            writer.submit({"timestamp": str(i), "input_text": f"text {i}", **RESULT})
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+
+    start = time.monotonic()
+    writer.shutdown(timeout=5)
+    assert time.monotonic() - start < 2
+
+    metrics = writer.metrics()
+    written = len(rows(writer))
+    assert written == metrics["written"]
+    if policy == "drop_oldest":
+        assert metrics["written"] + metrics["dropped"] == 800
+    else:
+        assert written == 800
+    assert metrics["queue_depth"] == 0
+
+
+def test_counters_are_exact_under_concurrent_submits(tmp_path):
+    writer = make_writer(tmp_path, max_queue=100_000)
+
+    def produce():
+        for i in range(1000):
+            writer.submit({"timestamp": str(i), "input_text": "x", **RESULT})
+
+    producers = [threading.Thread(target=produce) for _ in range(8)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    writer.flush()
+    metrics = writer.metrics()
+    writer.shutdown()
+    assert metrics["enqueued"] == 8000
+    assert metrics["written"] == 8000
+
+
+def test_writer_restarts_after_shutdown(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.submit({"timestamp": "1", "input_text": "before", **RESULT})
+    writer.shutdown()
+    writer.submit({"timestamp": "2", "input_text": "after", **RESULT})
+    writer.shutdown()
+    assert [row["input_text"] for row in rows(writer)] == ["before", "after"]
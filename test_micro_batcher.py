@@ -0,0 +1,82 @@
+# test_micro_batcher.py
+# Under concurrent submits MicroBatcher must merge requests into large batches (one batch in
+# flight, the rest collecting), and every caller must get its own result back.
+import asyncio
+import time
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def slow_batch(items):
+    # Like the image models: a fixed cost per forward pass plus a small cost per item
+    time.sleep(0.02 + 0.001 * len(items))
+    return [item * 2 for item in items]
+
+
+async def submit_all(batcher, num_items, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            return await batcher.submit(item)
+    return await asyncio.gather(*(one(item) for item in range(num_items)))
+
+
+@pytest.mark.parametrize("concurrency, min_mean_batch", [(8, 4), (32, 12), (128, 14)])
+def test_mean_batch_grows_with_concurrency(concurrency, min_mean_batch):
+    batcher = MicroBatcher(slow_batch, max_batch_size=16, max_wait_ms=5)
+    try:
+        results = asyncio.run(submit_all(batcher, 200, concurrency))
+    finally:
+        batcher.close()
+    assert results == [item * 2 for item in range(200)]
+    stats = batcher.stats()
+    assert stats["items"] == 200
+    assert stats["max_batch"] <= 16
+    assert stats["mean_batch"] >= min_mean_batch
+
+
+def test_single_request_waits_at_most_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=16, max_wait_ms=5)
+
+    async def run():
+        start = time.perf_counter()
+        result = await batcher.submit("x")
+        return result, time.perf_counter() - start
+    try:
+        result, seconds = asyncio.run(run())
+    finally:
+        batcher.close()
+    assert result == "x"
+    assert seconds < 0.1
+
+
+def test_batch_error_reaches_every_caller():
+    def failing(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(failing, max_batch_size=4, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(6)), return_exceptions=True)
+    try:
+        results = asyncio.run(run())
+    finally:
+        batcher.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_missing_results_fail_the_batch():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items[:-1]], max_batch_size=4, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True), timeout=2
+        )
+    try:
+        results = asyncio.run(run())
+    finally:
+        batcher.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
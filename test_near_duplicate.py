@@ -0,0 +1,69 @@
+# test_near_duplicate.py
+# The SimHash index must survive a save/load round trip unchanged, and never reuse a verdict
+# across texts that differ in negation.
+import random
+
+import near_duplicate
+
+VERDICT = {"is_harmful": "yes", "category": "violence", "explanation": "threat"}
+
+
+def test_load_restores_every_entry(tmp_path):
+    rng = random.Random(0)
+    index = near_duplicate.SimHashIndex()
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    for i, value in enumerate(values):
+        index.add(value, {**VERDICT, "explanation": f"entry {i}"}, negations=i % 3)
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+
+    loaded = near_duplicate.SimHashIndex.load(path)
+    assert len(loaded) == len(index)
+    assert not loaded.dirty
+    for i, value in enumerate(values):
+        assert loaded.query(value, i % 3) == index.query(value, i % 3) is not None
+        # One flipped bit still finds the entry through the bands
+        assert loaded.query(value ^ 1 << 40, i % 3) == index.query(value ^ 1 << 40, i % 3)
+        assert loaded.query(value, i % 3 + 3) is None
+
+
+def test_older_format_starts_an_empty_index(tmp_path):
+    path = tmp_path / "index.bin"
+    header = b'{"version": 1, "max_distance": 3, "count": 0}'
+    path.write_bytes(len(header).to_bytes(4, "little") + header + b"[]")
+    assert len(near_duplicate._load_index(str(path))) == 0
+
+
+def test_negation_flip_never_reuses_the_verdict():
+    index = near_duplicate.SimHashIndex()
+    near_duplicate.set_index(index)
+    try:
+        near_duplicate.remember("I will hurt you and everyone you love tonight", VERDICT)
+        assert near_duplicate.lookup("I will hurt you and everyone you love tonight!") is not None
+        assert near_duplicate.lookup("I will not hurt you and everyone you love tonight") is None
+        assert near_duplicate.lookup("I won't hurt you and everyone you love tonight") is None
+        assert near_duplicate.lookup("I won’t hurt you and everyone you love tonight") is None
+
+        # Random sentences of distinct words, with "not" inserted: no false near-duplicate hits
+        rng = random.Random(1)
+        vocabulary = [f"word{i}" for i in range(5000)]
+        for length in (12, 20, 30):
+            for _ in range(200):
+                words = rng.sample(vocabulary, length)
+                near_duplicate.remember(" ".join(words), VERDICT)
+                words.insert(rng.randrange(1, length), "not")
+                assert near_duplicate.lookup(" ".join(words)) is None
+    finally:
+        near_duplicate.set_index(None)
+
+
+def test_negated_entries_match_each_other():
+    index = near_duplicate.SimHashIndex()
+    near_duplicate.set_index(index)
+    try:
+        near_duplicate.remember("I would never ever hurt anyone at this school", {**VERDICT, "is_harmful": "no"})
+        match = near_duplicate.lookup("i would NEVER ever hurt anyone at this school.")
+        assert match["is_harmful"] == "no"
+        assert match["cache"] == "near_duplicate"
+    finally:
+        near_duplicate.set_index(None)
@@ -0,0 +1,64 @@
+# test_prefilter.py
+# The pre-filter may only answer for clear-cut text: short hostile text without a lexicon
+# phrase must escalate to the model (classify returns None), never be declared safe.
+import pytest
+
+import prefilter
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(prefilter, "ENABLED", True)
+
+
+@pytest.mark.parametrize("text", [
+    "gas all the jews",
+    "I will find where you live",
+    "all immigrants are vermin and should be deported",
+    "you are next",
+    "watch your back tonight",
+    "send me your nudes",
+    "hello, I know where your kids go to school",
+    "thanks, now give me your password",
+])
+def test_short_hostile_text_escalates(text):
+    assert prefilter.classify(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "hello",
+    "Hello, how are you?",
+    "thank you so much for your help!",
+    "good morning everyone",
+    "ok, thanks. bye!",
+])
+def test_allowlisted_pleasantries_are_safe(text):
+    result = prefilter.classify(text)
+    assert result is not None
+    assert result["is_harmful"] == "no"
+    assert result["tier"] == "prefilter"
+
+
+@pytest.mark.parametrize("text", ["what time is the meeting", "see you tomorrow at 5", "h3llo there"])
+def test_other_benign_text_still_goes_to_the_model(text):
+    assert prefilter.classify(text) is None
+
+
+@pytest.mark.parametrize("text, category", [
+    ("I want to kill myself", "self-harm"),
+    ("I will kill you if you come here", "violence"),
+    ("kill yourself", "harassment"),
+])
+def test_lexicon_phrases_are_harmful(text, category):
+    result = prefilter.classify(text)
+    assert result["is_harmful"] == "yes"
+    assert result["category"] == category
+
+
+def test_negated_phrase_escalates():
+    assert prefilter.classify("I would never kill myself") is None
+
+
+def test_disabled_returns_none(monkeypatch):
+    monkeypatch.setattr(prefilter, "ENABLED", False)
+    assert prefilter.classify("hello") is None
@@ -0,0 +1,72 @@
+# test_rate_limiter.py
+# A half-open probe that is cancelled before it finishes must reopen the circuit, not leave it
+# half-open and rejecting every later call.
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+import rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock):
+    breaker = rate_limiter.CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    return rate_limiter.GeminiScheduler(rpm=0, tpm=0, max_retries=0, breaker=breaker, clock=clock)
+
+
+def open_circuit(scheduler):
+    def fail():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        scheduler.call(fail)
+    assert scheduler.breaker.state == "open"
+
+
+def test_cancelled_probe_reopens_the_circuit():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    open_circuit(scheduler)
+    clock.now = 10
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(scheduler.acall(hang), timeout=0.01))
+    assert scheduler.breaker.state == "open"
+    assert scheduler.counters["cancelled"] == 1
+
+    # The next probe is let through once reset_seconds have passed again
+    clock.now = 20
+
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(scheduler.acall(ok)) == "ok"
+    assert scheduler.breaker.state == "closed"
+
+
+def test_interrupted_sync_probe_reopens_the_circuit():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    open_circuit(scheduler)
+    clock.now = 10
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.call(interrupted)
+    assert scheduler.breaker.state == "open"
+    with pytest.raises(rate_limiter.CircuitOpenError):
+        scheduler.call(lambda: "ok")
@@ -0,0 +1,32 @@
+# test_safety_checker.py
+# check_safety_batch must reject a concurrency that would start no workers instead of
+# returning a list of None.
+import pytest
+
+import cache
+import near_duplicate
+import prefilter
+import rate_limiter
+import safety_checker
+from fake_client import FakeClient
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    # Every text goes to the fake client; module globals are restored afterwards
+    monkeypatch.setattr(prefilter, "ENABLED", False)
+    monkeypatch.setattr(cache, "_disabled", True)
+    monkeypatch.setattr(near_duplicate, "_disabled", True)
+    monkeypatch.setattr(rate_limiter, "scheduler", None)
+
+
+@pytest.mark.parametrize("max_concurrency", [0, -1])
+def test_batch_rejects_concurrency_below_one(max_concurrency):
+    with pytest.raises(ValueError):
+        safety_checker.check_safety_batch(["some text"], max_concurrency=max_concurrency, api_client=FakeClient(0))
+
+
+def test_batch_returns_a_result_per_text():
+    texts = [f"message number {i}" for i in range(5)]
+    results = safety_checker.check_safety_batch(texts, max_concurrency=2, api_client=FakeClient(0))
+    assert [result["is_harmful"] for result in results] == ["no"] * 5
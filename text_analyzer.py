@@ -55,20 +55,29 @@
 
 
 # text_analyzer.py
-import os
-from dotenv import load_dotenv
 import streamlit as st
-from google import genai
-import json
+import cache
+import gemini_client
+import rate_limiter
+import response_parser
 
-# Load API key from .env
-load_dotenv()
-# Make sure you set your GOOGLE_API_KEY in environment variables
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-# Client Definition
-client = genai.Client(api_key=GOOGLE_API_KEY)
+MODEL_NAME = "gemini-2.5-flash"
+# Bump when the prompt (or the result shape) changes, so cached results are not reused
+PROMPT_VERSION = "2"
 
 def analyze_text_for_distress(text):
+    """
+    Analyze text for emotional distress: sentiment, risk_level, explanation, recommended_actions,
+    with sentiment and risk_level normalized to their allowed values ("unknown" otherwise).
+    Results for previously seen text come from the result cache.
+    """
+    return cache.cached_call(
+        "distress", text, MODEL_NAME, PROMPT_VERSION,
+        lambda: _analyze_text_for_distress(text),
+        cacheable=lambda result: not result.get("parse_error")
+    )
+
+def _build_prompt(text):
 #     prompt = f"""
 # Analyze this text for emotional distress, self harm, violence, or urgent risk.
 # Return JSON with fields:
@@ -78,7 +87,7 @@ def analyze_text_for_distress(text):
 # recommended_actions
 # Text: {text}
 # """
-    prompt = f"""
+    return f"""
     You are a psychological safety evaluator.
     Analyze the following text and return ONLY valid JSON (Do not include any explanations, comments, or extra text) with the following fields:
 
@@ -92,13 +101,18 @@ def analyze_text_for_distress(text):
     Return ONLY JSON, no other text.
     """
 
-    chat = client.chats.create(model="gemini-2.5-flash")
-    response = chat.send_message(prompt)
+def _analyze_text_for_distress(text):
+    prompt = _build_prompt(text)
+    # A single stateless request: no chat session (and its history) per analysis
+    response = rate_limiter.generate_content(
+        gemini_client.get_client(), MODEL_NAME, prompt,
+        config=gemini_client.json_config(response_parser.DISTRESS_SCHEMA)
+    )
 
-    try:
-        return json.loads(response.text)
-    except json.JSONDecodeError:
-        return {"raw_response": response.text}
+    result = response_parser.parse_distress(response.text).to_dict()
+    if result.get("parse_error"):
+        result["raw_response"] = response.text
+    return result
 
 # # --- Streamlit UI ---
 # st.title("Text Distress Detection")